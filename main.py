@@ -20,6 +20,7 @@ from src.frontend.login_page import login_page
 from src.frontend.change_password import change_password_form
 from src.component.sidebar import initialize_session_state, show_sidebar, reset_sidebar_rendering_state, add_title_above_nav
 from src.backend.database_branch import get_branch_mapping
+from src.backend.cache_warmer import start_cache_warmer
 from src.frontend.tab_funding import show_funding_tab
 from src.frontend.tab_lending import show_lending_tab
 
@@ -157,6 +158,9 @@ if not supabase_url or not supabase_key:
     st.error("Missing Supabase configuration. Please check your .env file or Streamlit secrets.")
     st.stop()
 
+# Keep the default dashboard window warm for everyone (no-op after the first run)
+start_cache_warmer()
+
 # Load initial data for global use
 all_branches = get_branch_mapping()
 all_branch_codes = list(all_branches.keys()) if all_branches else []
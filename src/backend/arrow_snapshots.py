@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from src.backend.supabase_client import get_env_var
+from src.backend.database_cache import DATA_DIR, temp_path
+
+# Loaded fact frames are written once as Arrow IPC files that every server process
+# memory-maps, so the OS page cache holds one copy however many processes run
+ARROW_SNAPSHOTS_ENABLED = get_env_var("ARROW_SNAPSHOTS_ENABLED", "true").lower() == "true"
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+# Disk budget for snapshots; the least recently written ones are removed beyond it
+SNAPSHOT_MAX_MB = int(get_env_var("SNAPSHOT_MAX_MB", 2048))
+
+META_SUFFIX = ".json"
+# attrs key of mapped frames: (path, column layout) of the file behind them
+SOURCE_ATTR = "arrow_source"
+
+def snapshot_name(key):
+    """File name stem for a cache key; the same in every process"""
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+
+def _frame_path(name, index):
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{index}.arrow")
+
+def _meta_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}{META_SUFFIX}")
+
+def _map_frame(path):
+    """Open an Arrow file as a DataFrame whose columns point into the memory map
+
+    Dates and amounts without missing values are not copied; code columns are
+    dictionary-encoded, so only their small integer codes are materialized.
+    The arrays are read-only, callers replace columns instead of mutating them.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    df = table.to_pandas(split_blocks=True)
+    df.attrs[SOURCE_ATTR] = (path, _column_layout(df))
+    return df
+
+def _column_layout(df):
+    """Name and data address of each column; replacing, reordering or filtering columns changes it"""
+    layout = []
+    for name, column in df.items():
+        values = column.array
+        if isinstance(values, pd.Categorical):
+            values = values.codes
+        layout.append((name, np.asarray(values).__array_interface__['data'][0]))
+    return tuple(layout)
+
+def snapshot_source(df):
+    """Path of the Arrow file whose rows df holds, None for other frames
+
+    pandas copies attrs to derived frames, so frames filtered from a mapped
+    frame or with a column replaced carry its source too; their data is
+    elsewhere, which tells them apart. Shallow copies still qualify.
+    """
+    source = df.attrs.get(SOURCE_ATTR)
+    if source is None or source[1] != _column_layout(df):
+        return None
+    return source[0]
+
+def _write_frame(path, df):
+    tmp_path = temp_path(path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def read_snapshot(name, ttl=None):
+    """Return (True, value) for a complete snapshot younger than ttl seconds, else (False, None)"""
+    meta_path = _meta_path(name)
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(meta_path) > ttl:
+            return False, None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        frames = [_map_frame(_frame_path(name, index)) for index in range(meta['frames'])]
+    except FileNotFoundError:
+        return False, None
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {name}: {str(e)}")
+        return False, None
+    return True, tuple(frames) if meta['kind'] == 'tuple' else frames[0]
+
+def write_snapshot(name, value):
+    """Write a DataFrame or tuple of DataFrames; the metadata file goes last and marks it complete
+
+    Returns:
+        bool: False if the value cannot be snapshotted
+    """
+    frames = list(value) if isinstance(value, tuple) else [value]
+    if not frames or not all(isinstance(frame, pd.DataFrame) for frame in frames):
+        return False
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for index, frame in enumerate(frames):
+        _write_frame(_frame_path(name, index), frame)
+    meta_path = _meta_path(name)
+    tmp_path = temp_path(meta_path)
+    with open(tmp_path, 'w') as f:
+        json.dump({'kind': 'tuple' if isinstance(value, tuple) else 'frame', 'frames': len(frames)}, f)
+    os.replace(tmp_path, meta_path)
+    return True
+
+def prune_snapshots(max_bytes=SNAPSHOT_MAX_MB * 1024 * 1024):
+    """Remove the oldest snapshots until the directory fits max_bytes
+
+    Processes still mapping a removed file keep reading it; the space is
+    freed once the last map is closed.
+    """
+    snapshots = {}
+    try:
+        for entry in os.scandir(SNAPSHOT_DIR):
+            name = entry.name.split('-')[0].split('.')[0]
+            size, mtime = snapshots.get(name, (0, 0))
+            stat = entry.stat()
+            snapshots[name] = (size + stat.st_size, max(mtime, stat.st_mtime))
+    except FileNotFoundError:
+        return
+    total = sum(size for size, _ in snapshots.values())
+    for name, (size, _) in sorted(snapshots.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        for filename in os.listdir(SNAPSHOT_DIR):
+            if filename.startswith(name):
+                try:
+                    os.remove(os.path.join(SNAPSHOT_DIR, filename))
+                except OSError as e:
+                    # E.g. still mapped on Windows; retried on the next prune
+                    print(f"Could not remove snapshot file {filename}: {str(e)}")
+        total -= size
+
+def shared_snapshot(key, compute, ttl=None):
+    """Return the value for key from its snapshot, computing and writing it if missing
+
+    A computed value is returned through its memory map as well, so the process
+    that wrote it does not keep a private copy. If compute raises, nothing is written.
+    """
+    if not ARROW_SNAPSHOTS_ENABLED:
+        return compute()
+    name = snapshot_name(key)
+    found, value = read_snapshot(name, ttl)
+    if found:
+        return value
+    value = compute()
+    try:
+        if not write_snapshot(name, value):
+            return value
+        prune_snapshots()
+    except Exception as e:
+        print(f"Could not write snapshot {name}: {str(e)}")
+        return value
+    found, mapped = read_snapshot(name)
+    return mapped if found else value
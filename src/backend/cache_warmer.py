@@ -0,0 +1,57 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import streamlit as st
+from src.backend.supabase_client import get_env_var
+from src.backend.database_mapping import get_mapping
+from src.backend.database_funding import get_funding_data
+from src.backend.database_lending import get_lending_data
+
+# Background warming of the caches hit by a fresh dashboard session
+CACHE_WARMER_ENABLED = get_env_var("CACHE_WARMER_ENABLED", "true").lower() == "true"
+# Seconds between warm cycles. Cached entries make a cycle nearly free, so this
+# mainly bounds how long after a sync or expiry the caches stay cold
+CACHE_WARMER_INTERVAL_SECONDS = int(get_env_var("CACHE_WARMER_INTERVAL_SECONDS", 60))
+# Must match the default window set by initialize_session_state
+CACHE_WARMER_DAYS = int(get_env_var("CACHE_WARMER_DAYS", 30))
+CACHE_WARMER_PREVIOUS_MONTH = get_env_var("CACHE_WARMER_PREVIOUS_MONTH", "false").lower() == "true"
+
+def _default_windows():
+    """Date windows a new session asks for: the default range and optionally last month"""
+    today = datetime.now().date()
+    windows = [(today - timedelta(days=CACHE_WARMER_DAYS), today)]
+    if CACHE_WARMER_PREVIOUS_MONTH:
+        previous_month_end = today.replace(day=1) - timedelta(days=1)
+        windows.append((previous_month_end.replace(day=1), previous_month_end))
+    return windows
+
+def warm_caches():
+    """Load the mappings and default windows through the regular cached loaders"""
+    started = time.monotonic()
+    # All branches, as initialize_session_state selects for users with full access.
+    # This also loads every other mapping, they share one cache entry
+    branches = list(get_mapping('branch').keys())
+    for start_date, end_date in _default_windows():
+        # Same argument types as the tabs pass, so the warmed entries are the ones they hit
+        get_funding_data(start_date=pd.to_datetime(start_date), end_date=pd.to_datetime(end_date), branches=branches)
+        get_lending_data(start_date=pd.to_datetime(start_date), end_date=pd.to_datetime(end_date), branches=branches)
+    print(f"Cache warm cycle finished in {time.monotonic() - started:.1f}s")
+
+def _warm_loop():
+    while True:
+        try:
+            warm_caches()
+        except Exception as e:
+            print(f"Error warming caches: {str(e)}")
+        time.sleep(CACHE_WARMER_INTERVAL_SECONDS)
+
+@st.cache_resource
+def start_cache_warmer():
+    """Start the warmer thread once per server process (later calls return the same thread)"""
+    if not CACHE_WARMER_ENABLED:
+        return None
+    thread = threading.Thread(target=_warm_loop, name="cache-warmer", daemon=True)
+    thread.start()
+    print(f"Started cache warmer, refreshing every {CACHE_WARMER_INTERVAL_SECONDS}s")
+    return thread
@@ -0,0 +1,141 @@
+import argparse
+import os
+import sqlite3
+import time
+from src.backend.database_offline import (
+    OFFLINE_SOURCES,
+    SQLITE_DATA_DIR,
+    CONSOLIDATED_DB_PATH,
+    CONSOLIDATED_FORMAT,
+    monthly_tables
+)
+
+# Source columns -> typed columns of the consolidated fact tables. Everything is
+# converted here once, so readers get numbers and never parse text per request
+COLUMN_TYPES = {
+    'tanggal': 'INTEGER NOT NULL',  # days since 1970-01-01
+    'kode_cabang': 'TEXT NOT NULL',
+    'kode_produk': 'TEXT NOT NULL',
+    'kolektibilitas': 'INTEGER',
+    'nominal': 'REAL',
+}
+
+def _date_expression(source):
+    """SQL turning the source Tanggal into days since 1970-01-01"""
+    if source['date_format'] == '%Y%m%d':
+        iso_date = "substr(Tanggal, 1, 4) || '-' || substr(Tanggal, 5, 2) || '-' || substr(Tanggal, 7, 2)"
+    else:
+        iso_date = "substr(Tanggal, 1, 10)"
+    # 2440587.5 is the Julian day of 1970-01-01 00:00
+    return f"CAST(julianday({iso_date}) - 2440587.5 AS INTEGER)"
+
+def _select_expression(column, source_column, source):
+    if column == 'tanggal':
+        return _date_expression(source)
+    if column == 'kolektibilitas':
+        return f"CAST({source_column} AS INTEGER)"
+    if column == 'nominal':
+        return f"CAST({source_column} AS REAL)"
+    return source_column
+
+def _create_tables(conn, rebuild=False):
+    for table_name, source in OFFLINE_SOURCES.items():
+        if rebuild:
+            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+        definitions = ", ".join(f"{column} {COLUMN_TYPES[column]}" for column in source['columns'])
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({definitions})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_tanggal_cabang_produk "
+                     f"ON {table_name} (tanggal, kode_cabang, kode_produk)")
+    if rebuild:
+        conn.execute("DROP TABLE IF EXISTS consolidated_months")
+    # Which monthly source tables are in the store, and how many rows they had
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS consolidated_months (
+            table_name TEXT NOT NULL,
+            source_table TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            consolidated_at REAL NOT NULL,
+            PRIMARY KEY (table_name, source_table)
+        )
+    """)
+
+def consolidate_table(conn, table_name):
+    """Copy new or changed months of one snapshot into its consolidated table
+
+    A month is copied again when its source row count differs from the recorded
+    one, which covers the current month still being appended to.
+
+    Returns:
+        int: Number of months copied
+    """
+    source = OFFLINE_SOURCES[table_name]
+    source_path = os.path.join(SQLITE_DATA_DIR, source['file'])
+    if not os.path.exists(source_path):
+        print(f"Skipping {table_name}: {source_path} not found")
+        return 0
+
+    recorded = dict(conn.execute(
+        "SELECT source_table, row_count FROM consolidated_months WHERE table_name = ?", (table_name,)
+    ).fetchall())
+    columns = list(source['columns'])
+    select_list = ", ".join(
+        _select_expression(column, source_column, source) for column, source_column in source['columns'].items()
+    )
+
+    conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+    try:
+        source_tables = monthly_tables(conn, source['prefix'], schema='src')
+        copied = 0
+        for source_table in source_tables:
+            row_count = conn.execute(f"SELECT COUNT(*) FROM src.{source_table}").fetchone()[0]
+            if recorded.get(source_table) == row_count:
+                continue
+            with conn:
+                # Replace the dates this table holds; some monthly tables also hold
+                # the first day of the next month, which must not be dropped
+                conn.execute(f"DELETE FROM {table_name} WHERE tanggal IN "
+                             f"(SELECT DISTINCT {_date_expression(source)} FROM src.{source_table})")
+                conn.execute(f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                             f"SELECT {select_list} FROM src.{source_table}")
+                conn.execute("INSERT OR REPLACE INTO consolidated_months VALUES (?, ?, ?, ?)",
+                             (table_name, source_table, row_count, time.time()))
+            copied += 1
+            print(f"Consolidated {source_table} into {table_name} ({row_count} rows)")
+    finally:
+        conn.execute("DETACH DATABASE src")
+    return copied
+
+def consolidate(target_path=CONSOLIDATED_DB_PATH, rebuild=False):
+    """Merge the monthly snapshot tables into one indexed fact table per type
+
+    Args:
+        target_path (str): The consolidated database, created if missing
+        rebuild (bool): Drop and copy everything instead of only new or changed months
+    """
+    started = time.monotonic()
+    conn = sqlite3.connect(target_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != CONSOLIDATED_FORMAT:
+            # Created by an older version, or new
+            rebuild = True
+        with conn:
+            _create_tables(conn, rebuild)
+            conn.execute(f"PRAGMA user_version = {CONSOLIDATED_FORMAT}")
+        copied = sum(consolidate_table(conn, table_name) for table_name in OFFLINE_SOURCES)
+        if copied:
+            conn.execute("ANALYZE")
+        # Fold the WAL into the main file, so its mtime (the offline cache key) moves
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    print(f"Consolidated {copied} months into {target_path} in {time.monotonic() - started:.1f}s")
+    return copied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the monthly SQLite snapshots into one indexed store")
+    parser.add_argument("--target", default=CONSOLIDATED_DB_PATH, help="Consolidated database path")
+    parser.add_argument("--rebuild", action="store_true", help="Copy every month again")
+    args = parser.parse_args()
+    consolidate(args.target, args.rebuild)
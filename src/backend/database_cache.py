@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.backend.supabase_client import get_env_var
+
+# Persistent cache location and behaviour
+DATA_DIR = get_env_var("DATA_DIR", "./data")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+LOCAL_CACHE_ENABLED = get_env_var("LOCAL_CACHE_ENABLED", "true").lower() == "true"
+# Days newer than this many days ago are never persisted. With change tracking the
+# recent days are refreshed from their watermark, so this can stay at 0
+LOCAL_CACHE_SETTLE_DAYS = int(get_env_var("LOCAL_CACHE_SETTLE_DAYS", 0))
+# Minimum seconds between two change checks of the same table and range
+REFRESH_INTERVAL_SECONDS = int(get_env_var("REFRESH_INTERVAL_SECONDS", 120))
+# Branch-filtered loads are cached per selection; at most this many selections are
+# kept per table, the least recently used ones are removed
+LOCAL_CACHE_MAX_SCOPES = int(get_env_var("LOCAL_CACHE_MAX_SCOPES", 8))
+
+MANIFEST_FILE = "_manifest.json"
+SCOPE_PREFIX = "scope-"
+# Column maintained by the update_modified_column() triggers in supabase_setup.sql
+WATERMARK_COLUMN = "updated_at"
+
+# table -> (checked_start, checked_end, monotonic time, data version) of the last change check
+_last_refresh = {}
+
+# One lock per table guards its manifest against concurrent loaders in this process
+_table_locks = {}
+_table_locks_guard = threading.Lock()
+
+def _get_table_lock(table_name):
+    with _table_locks_guard:
+        return _table_locks.setdefault(table_name, threading.Lock())
+
+def _table_dir(table_name):
+    return os.path.join(CACHE_DIR, table_name)
+
+def _partition_path(table_name, day):
+    return os.path.join(_table_dir(table_name), f"{day.strftime('%Y-%m-%d')}.parquet")
+
+def _load_manifest(table_name):
+    """Load {day: {"columns": [...], "rows": n}} for a table's cached partitions"""
+    path = os.path.join(_table_dir(table_name), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading cache manifest for {table_name}, ignoring it: {str(e)}")
+        return {}
+
+def temp_path(path):
+    """A new, uniquely named file next to path to write before replacing path with it
+
+    The name is unique across processes and threads, so concurrent writers of the
+    same file never share a temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    return tmp_path
+
+def _save_manifest(table_name, manifest):
+    """Write the manifest atomically so readers never see a partial file"""
+    os.makedirs(_table_dir(table_name), exist_ok=True)
+    path = os.path.join(_table_dir(table_name), MANIFEST_FILE)
+    tmp_path = temp_path(path)
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def _write_partition(table_name, day, df):
+    os.makedirs(_table_dir(table_name), exist_ok=True)
+    path = _partition_path(table_name, day)
+    tmp_path = temp_path(path)
+    # Store categorical codes as plain strings so every partition has the same schema
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+def _prune_scopes(table_name, max_scopes=LOCAL_CACHE_MAX_SCOPES):
+    """Remove the least recently used scope directories of a table beyond max_scopes"""
+    try:
+        scopes = [entry for entry in os.scandir(_table_dir(table_name))
+                  if entry.is_dir() and entry.name.startswith(SCOPE_PREFIX)]
+    except FileNotFoundError:
+        return
+    scopes.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in scopes[max_scopes:]:
+        scoped_table = os.path.join(table_name, entry.name)
+        with _get_table_lock(scoped_table):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        _last_refresh.pop(scoped_table, None)
+        print(f"Removed cached scope {scoped_table}")
+
+def _is_settled(day):
+    """A day is settled once the sync is no longer expected to add rows for it"""
+    return day.date() <= datetime.now().date() - timedelta(days=LOCAL_CACHE_SETTLE_DAYS)
+
+def _day_key(day):
+    return day.strftime('%Y-%m-%d')
+
+def _needs_refresh(table_name, start, end, version=None):
+    checked = _last_refresh.get(table_name)
+    if checked is None:
+        return True
+    checked_start, checked_end, checked_at, checked_version = checked
+    if not (checked_start <= start and end <= checked_end):
+        return True
+    if version is not None:
+        # Nothing was written to the table since the last check
+        return version != checked_version
+    return time.monotonic() - checked_at > REFRESH_INTERVAL_SECONDS
+
+def _find_stale_days(table_name, manifest, days, fetch_changes, version=None, fetch_counts=None):
+    """Return keys of cached days that changed on the server since they were stored
+
+    Each partition remembers the highest updated_at seen when it was fetched.
+    One query asks for rows in the range changed since the oldest of those
+    watermarks, and every day holding a newer row is refetched in full.
+    Days stored without a watermark are refetched rather than checked, so they
+    do not pull the query back to the epoch. Deleted rows leave no newer
+    updated_at behind, so with fetch_counts the server's rows per day are
+    compared with the stored counts as well.
+    """
+    cached = [day for day in days if _day_key(day) in manifest]
+    if not cached or not _needs_refresh(table_name, cached[0], cached[-1], version):
+        return set()
+
+    unmarked = {_day_key(day) for day in cached if not manifest[_day_key(day)].get('watermark')}
+    watermarks = {
+        _day_key(day): pd.Timestamp(manifest[_day_key(day)]['watermark'])
+        for day in cached if _day_key(day) not in unmarked
+    }
+    if not watermarks:
+        return unmarked
+    since = min(watermarks.values())
+    try:
+        changes = fetch_changes(cached[0], cached[-1], since)
+    except Exception as e:
+        print(f"Could not check {table_name} for changes, serving cached data: {str(e)}")
+        return set()
+    counts = None
+    if fetch_counts is not None:
+        try:
+            counts = fetch_counts(cached[0], cached[-1])
+        except Exception as e:
+            print(f"Could not count the rows per day of {table_name}, only checking updates: {str(e)}")
+    _last_refresh[table_name] = (cached[0], cached[-1], time.monotonic(), version)
+
+    stale = set(unmarked)
+    if counts is not None:
+        server_rows = {
+            _day_key(day): rows
+            for day, rows in zip(pd.to_datetime(counts['tanggal']).dt.normalize(), counts['row_count'])
+        } if not counts.empty else {}
+        # Days with rows deleted, or deleted entirely
+        stale |= {key for key in watermarks if manifest[key]['rows'] != server_rows.get(key, 0)}
+    if not changes.empty:
+        changes = changes.assign(
+            tanggal=pd.to_datetime(changes['tanggal']).dt.normalize(),
+            **{WATERMARK_COLUMN: pd.to_datetime(changes[WATERMARK_COLUMN], utc=True, format='ISO8601')}
+        )
+        latest = changes.groupby('tanggal')[WATERMARK_COLUMN].max()
+        stale |= {
+            _day_key(day) for day, updated in latest.items()
+            if _day_key(day) in watermarks and updated > watermarks[_day_key(day)]
+        }
+    if stale - unmarked:
+        print(f"Refreshing {len(stale - unmarked)} changed days of {table_name} since {since.isoformat()}")
+    return stale
+
+def _contiguous_runs(days):
+    """Group sorted days into inclusive (start, end) runs of consecutive days"""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == pd.Timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [(start, end) for start, end in runs]
+
+def get_partitioned_data(table_name, start_date, end_date, columns, fetch, fetch_changes=None, scope=None,
+                         version=None, fetch_counts=None):
+    """Read [start_date, end_date] from local day partitions, fetching only the missing days
+
+    Cached days whose rows changed on the server since they were stored are
+    refetched and replace the old partition.
+
+    Args:
+        table_name (str): Table or view name, used as the cache directory
+        start_date, end_date: Inclusive date range
+        columns (list): Columns to return; must include 'tanggal'
+        fetch (callable): fetch(start, end, columns) returning a DataFrame for an inclusive range.
+            It must raise rather than return partial data, since results are persisted.
+        fetch_changes (callable): fetch_changes(start, end, since) returning tanggal/updated_at
+            of rows changed after `since`. Without it cached days are never refreshed.
+        scope (str): Sub-directory for loads restricted by filters, so their partitions
+            are kept apart from the table's full partitions
+        version: The table's recorded data version. When given, change checks are
+            skipped until it moves instead of running every REFRESH_INTERVAL_SECONDS
+        fetch_counts (callable): fetch_counts(start, end) returning tanggal/row_count per day
+            on the server, so days that lost rows are refetched too
+    """
+    # Imported here, database_utils depends on this module
+    from src.backend.database_utils import _column_kind, concat_fact_frames
+
+    if scope:
+        base_table = table_name
+        table_name = os.path.join(table_name, scope)
+        if os.path.isdir(_table_dir(table_name)):
+            # Mark the scope as used for _prune_scopes
+            os.utime(_table_dir(table_name))
+    days = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+    if len(days) == 0:
+        return pd.DataFrame()
+
+    with _get_table_lock(table_name):
+        manifest = _load_manifest(table_name)
+
+    def is_cached(day):
+        entry = manifest.get(_day_key(day))
+        if entry is None or not set(columns) <= set(entry['columns']):
+            return False
+        return entry['rows'] == 0 or os.path.exists(_partition_path(table_name, day))
+
+    stale_days = _find_stale_days(table_name, manifest, days, fetch_changes, version,
+                                  fetch_counts) if fetch_changes else set()
+    missing_days = [day for day in days
+                    if not is_cached(day) or not _is_settled(day) or _day_key(day) in stale_days]
+    cached_days = [day for day in days if day not in set(missing_days)]
+    print(f"Local cache for {table_name}: {len(cached_days)} cached days, {len(missing_days)} to fetch")
+
+    # Fetch the union of requested and previously stored columns so loaders with
+    # different column sets do not keep overwriting each other's partitions
+    stored_columns = set()
+    for entry in manifest.values():
+        stored_columns.update(entry['columns'])
+    fetch_columns = list(columns) + sorted(stored_columns - set(columns))
+    request_columns = fetch_columns + ([WATERMARK_COLUMN] if fetch_changes else [])
+
+    frames = []
+    new_entries = {}
+    for run_start, run_end in _contiguous_runs(missing_days):
+        # Taken before the fetch, so a row written while it runs is newer than the watermark
+        fetched_at = pd.Timestamp.now(tz="UTC")
+        fetched = fetch(run_start, run_end, request_columns)
+        if fetched.empty:
+            fetched = pd.DataFrame(columns=request_columns)
+        fetched['tanggal'] = pd.to_datetime(fetched['tanggal'])
+
+        # Every row of the run was read at once, so the run's highest updated_at is a
+        # safe watermark for each of its days, including the empty ones. A run without
+        # rows is current as of the fetch
+        watermark = fetched_at.isoformat()
+        if WATERMARK_COLUMN in fetched.columns:
+            if fetched[WATERMARK_COLUMN].notna().any():
+                watermark = pd.to_datetime(fetched[WATERMARK_COLUMN], utc=True, format='ISO8601').max().isoformat()
+            fetched = fetched.drop(columns=[WATERMARK_COLUMN])
+
+        partitions = dict(tuple(fetched.groupby(fetched['tanggal'].dt.normalize())))
+        for day in pd.date_range(run_start, run_end, freq='D'):
+            part = partitions.get(day, fetched.iloc[0:0])
+            if _is_settled(day):
+                if not part.empty:
+                    _write_partition(table_name, day, part)
+                elif os.path.exists(_partition_path(table_name, day)):
+                    # The day was emptied on the server since it was cached
+                    os.remove(_partition_path(table_name, day))
+                new_entries[_day_key(day)] = {'columns': fetch_columns, 'rows': len(part), 'watermark': watermark}
+        frames.append(fetched[[col for col in columns if col in fetched.columns]])
+
+    if new_entries:
+        with _get_table_lock(table_name):
+            # Re-read so entries written by other loaders meanwhile are kept
+            manifest = _load_manifest(table_name)
+            manifest.update(new_entries)
+            _save_manifest(table_name, manifest)
+        if scope:
+            _prune_scopes(base_table)
+
+    # Read the cached days that actually hold rows
+    cached_paths = [_partition_path(table_name, day) for day in cached_days
+                    if manifest[_day_key(day)]['rows'] > 0]
+    if cached_paths:
+        # Codes come back dictionary-encoded, i.e. as categoricals, and dates and
+        # amounts in their stored types, so a cached day needs no conversion
+        code_columns = [col for col in columns if _column_kind(col) == 'code']
+        tables = [pq.read_table(path, columns=columns, read_dictionary=code_columns) for path in cached_paths]
+        frames.append(pa.concat_tables(tables, promote_options='default').to_pandas())
+
+    df = concat_fact_frames(frames)
+    if df.empty:
+        return df
+    return df.sort_values('tanggal', kind='stable').reset_index(drop=True)
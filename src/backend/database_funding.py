@@ -1,21 +1,53 @@
 import pandas as pd
-import streamlit as st
+from src.backend.frame_cache import cache_frames
 from src.backend.database_utils import (
     handle_db_errors,
     get_cached_data,
-    validate_funding_data
+    run_concurrently,
+    validate_funding_data,
+    build_cube,
+    normalize_filter,
+    normalize_branch_filter,
+    USE_AGGREGATE_VIEWS,
+    reads_daily_totals,
+    source_version,
+    VERSIONED_CACHE_TTL
 )
+from src.backend.database_offline import DATA_BACKEND, get_offline_data, offline_version
+
+# The SQLite snapshots stand in for Supabase when DATA_BACKEND=sqlite
+_load_table = get_offline_data if DATA_BACKEND == 'sqlite' else get_cached_data
+_table_version = offline_version if DATA_BACKEND == 'sqlite' else source_version
+# Raw rows are summed into a cube; the daily views and the SQLite snapshots hold one already
+_reads_daily_totals = (lambda *args: True) if DATA_BACKEND == 'sqlite' else reads_daily_totals
+
+def get_funding_data(start_date, end_date, branches=None, products=None, aggregate=USE_AGGREGATE_VIEWS):
+    """Get funding data within date range (from Supabase or the SQLite snapshots, see DATA_BACKEND)
+
+    Args:
+        branches (list): Branch codes to load, None for all branches
+        products (list): Product codes to load, None for all products
+        aggregate (bool): Read daily totals from the aggregate views instead of raw rows
+    """
+    # Normalize the filters first so equal selections share one cache entry,
+    # and key on the data versions so a sync invalidates it
+    return _load_funding_data(start_date, end_date, normalize_branch_filter(branches),
+                              normalize_filter(products), aggregate,
+                              (_table_version('deposito_data'), _table_version('tabungan_data')))
 
-@st.cache_data(ttl=3600)
 @handle_db_errors(default_return=lambda: (pd.DataFrame(), pd.DataFrame()))
-def get_funding_data(start_date, end_date):
-    """Get funding data from Supabase within date range"""
+@cache_frames(ttl=VERSIONED_CACHE_TTL, shared=True)
+def _load_funding_data(start_date, end_date, branches, products, aggregate, versions):
     # Define columns to fetch
     columns = ['tanggal', 'kode_cabang', 'kode_produk', 'nominal']
     
-    # Get data for both types
-    deposito_df = get_cached_data('deposito_data', start_date, end_date, columns)
-    tabungan_df = get_cached_data('tabungan_data', start_date, end_date, columns)
+    # Get data for both types concurrently, filtered by branch and product on the server
+    deposito_df, tabungan_df = run_concurrently(
+        lambda: _load_table('deposito_data', start_date, end_date, columns, aggregate=aggregate,
+                            branches=branches, products=products),
+        lambda: _load_table('tabungan_data', start_date, end_date, columns, aggregate=aggregate,
+                            branches=branches, products=products)
+    )
     
     # Rename columns to match existing code
     column_mapping = {
@@ -28,9 +60,13 @@ def get_funding_data(start_date, end_date):
     if not deposito_df.empty:
         deposito_df = deposito_df.rename(columns=column_mapping)
         deposito_df = validate_funding_data(deposito_df)
+        if not _reads_daily_totals('deposito_data', columns, aggregate):
+            deposito_df = build_cube(deposito_df, ['Nominal'], label='deposito')
         
     if not tabungan_df.empty:
         tabungan_df = tabungan_df.rename(columns=column_mapping)
         tabungan_df = validate_funding_data(tabungan_df)
+        if not _reads_daily_totals('tabungan_data', columns, aggregate):
+            tabungan_df = build_cube(tabungan_df, ['Nominal'], label='tabungan')
         
     return deposito_df, tabungan_df 
\ No newline at end of file
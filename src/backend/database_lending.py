@@ -1,30 +1,65 @@
 import pandas as pd
-import streamlit as st
+from src.backend.frame_cache import cache_frames
 from src.backend.database_utils import (
     handle_db_errors,
     get_cached_data,
-    validate_lending_data
+    run_concurrently,
+    validate_lending_data,
+    build_cube,
+    normalize_filter,
+    normalize_branch_filter,
+    USE_AGGREGATE_VIEWS,
+    reads_daily_totals,
+    source_version,
+    VERSIONED_CACHE_TTL
 )
 from src.backend.supabase_client import get_supabase_client, get_admin_client
+from src.backend.database_offline import DATA_BACKEND, get_offline_data, offline_version
+
+# The SQLite snapshots stand in for Supabase when DATA_BACKEND=sqlite
+_load_table = get_offline_data if DATA_BACKEND == 'sqlite' else get_cached_data
+_table_version = offline_version if DATA_BACKEND == 'sqlite' else source_version
+# Raw rows are summed into a cube; the daily views and the SQLite snapshots hold one already
+_reads_daily_totals = (lambda *args: True) if DATA_BACKEND == 'sqlite' else reads_daily_totals
+
+def get_lending_data(start_date, end_date, branches=None, products=None, aggregate=USE_AGGREGATE_VIEWS):
+    """Get lending data within date range (from Supabase or the SQLite snapshots, see DATA_BACKEND)
+
+    Args:
+        branches (list): Branch codes to load, None for all branches
+        products (list): Product codes to load, None for all products
+        aggregate (bool): Read daily totals from the aggregate views instead of raw rows.
+            The aggregate views do not carry kd_sts_pemb, which the dashboard does not use.
+    """
+    # Normalize the filters first so equal selections share one cache entry,
+    # and key on the data versions so a sync invalidates it
+    return _load_lending_data(start_date, end_date, normalize_branch_filter(branches),
+                              normalize_filter(products), aggregate,
+                              (_table_version('pembiayaan_data'), _table_version('rahn_data')))
 
-@st.cache_data(ttl=3600)
 @handle_db_errors(default_return=lambda: (pd.DataFrame(), pd.DataFrame()))
-def get_lending_data(start_date, end_date):
-    """Get lending data from Supabase within date range"""
+@cache_frames(ttl=VERSIONED_CACHE_TTL, shared=True)
+def _load_lending_data(start_date, end_date, branches, products, aggregate, versions):
     # Define columns to fetch
     pembiayaan_columns = [
         'tanggal', 'kode_cabang', 'kode_produk', 'kolektibilitas',
         'jml_pencairan', 'byr_pokok', 'outstanding', 'kd_sts_pemb',
         'kode_grup1', 'kode_grup2', 'kd_kolektor'
     ]
+    if aggregate:
+        pembiayaan_columns.remove('kd_sts_pemb')
     
     rahn_columns = ['tanggal', 'kode_cabang', 'kode_produk', 'nominal', 'kolektibilitas']
     
     print(f"Fetching lending data from {start_date} to {end_date}")
     
-    # Get data for both types using batching method
-    pembiayaan_df = get_cached_data('pembiayaan_data', start_date, end_date, pembiayaan_columns)
-    rahn_df = get_cached_data('rahn_data', start_date, end_date, rahn_columns)
+    # Get data for both types concurrently using batching method
+    pembiayaan_df, rahn_df = run_concurrently(
+        lambda: _load_table('pembiayaan_data', start_date, end_date, pembiayaan_columns, aggregate=aggregate,
+                            branches=branches, products=products),
+        lambda: _load_table('rahn_data', start_date, end_date, rahn_columns, aggregate=aggregate,
+                            branches=branches, products=products)
+    )
     
     # Debug information
     if pembiayaan_df.empty:
@@ -78,12 +113,11 @@ def get_lending_data(start_date, end_date):
     }
     
     if not pembiayaan_df.empty:
-        # Convert outstanding to numeric, replacing any errors with 0
-        if 'outstanding' in pembiayaan_df.columns:
-            pembiayaan_df['outstanding'] = pd.to_numeric(pembiayaan_df['outstanding'], errors='coerce').fillna(0)
-        
         pembiayaan_df = pembiayaan_df.rename(columns=pembiayaan_mapping)
         pembiayaan_df = validate_lending_data(pembiayaan_df)
+        # Every tab computation reads the cube instead of raw rows
+        if not _reads_daily_totals('pembiayaan_data', pembiayaan_columns, aggregate):
+            pembiayaan_df = build_cube(pembiayaan_df, ['JmlPencairan', 'ByrPokok', 'Outstanding'], label='pembiayaan')
         
         # After validation, check if Outstanding column exists and has valid data
         if 'Outstanding' in pembiayaan_df.columns:
@@ -91,12 +125,10 @@ def get_lending_data(start_date, end_date):
             print(f"Pembiayaan Outstanding min: {pembiayaan_df['Outstanding'].min()}, max: {pembiayaan_df['Outstanding'].max()}, mean: {pembiayaan_df['Outstanding'].mean()}")
         
     if not rahn_df.empty:
-        # Convert nominal to numeric
-        if 'nominal' in rahn_df.columns:
-            rahn_df['nominal'] = pd.to_numeric(rahn_df['nominal'], errors='coerce').fillna(0)
-            
         rahn_df = rahn_df.rename(columns=rahn_mapping)
         rahn_df = validate_lending_data(rahn_df)
+        if not _reads_daily_totals('rahn_data', rahn_columns, aggregate):
+            rahn_df = build_cube(rahn_df, ['Nominal'], label='rahn')
         
         # After validation, check if Nominal column exists and has valid data
         if 'Nominal' in rahn_df.columns:
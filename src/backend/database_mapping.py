@@ -0,0 +1,131 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from src.backend.supabase_client import get_admin_client
+from src.backend.database_versions import recorded_version, VERSIONED_CACHE_TTL, MAPPING_CACHE_TTL
+from src.backend.database_cache import DATA_DIR, temp_path
+from src.backend.database_offline import DATA_BACKEND, get_offline_mappings, offline_version
+
+# Dimension tables: mapping name -> (table, code column, name column)
+MAPPING_TABLES = {
+    'branch': ('branch_mapping', 'kode_cabang', 'nama_cabang'),
+    'deposito_product': ('deposito_product_mapping', 'kode_produk', 'nama_produk'),
+    'tabungan_product': ('tabungan_product_mapping', 'kode_produk', 'nama_produk'),
+    'pembiayaan_product': ('pembiayaan_product_mapping', 'kode_produk', 'nama_produk'),
+    'rahn_product': ('rahn_product_mapping', 'kode_produk', 'nama_produk'),
+    'grup1': ('grup1_mapping', 'kode_grup1', 'nama_grup'),
+    'grup2': ('grup2_mapping', 'kode_grup2', 'nama_grup'),
+}
+MAPPING_TABLE_NAMES = [table for table, _, _ in MAPPING_TABLES.values()]
+
+# Last loaded mappings, so a restarted server can answer before Supabase does
+MAPPING_SNAPSHOT_PATH = os.path.join(DATA_DIR, "mappings.json")
+
+def _rows_to_mapping(rows, code_column, name_column):
+    return {row[code_column]: row[name_column] for row in rows or []}
+
+def _load_via_rpc(supabase):
+    """Load every mapping in one round-trip through get_mappings() (see supabase_setup.sql)"""
+    response = supabase.rpc('get_mappings').execute()
+    data = response.data or {}
+    return {
+        name: _rows_to_mapping(data.get(table), code_column, name_column)
+        for name, (table, code_column, name_column) in MAPPING_TABLES.items()
+    }
+
+def _load_via_tables(supabase):
+    """Load every mapping table with concurrent queries, for servers without get_mappings()"""
+    def load(item):
+        name, (table, code_column, name_column) = item
+        response = supabase.table(table).select(f"{code_column}, {name_column}").execute()
+        return name, _rows_to_mapping(response.data, code_column, name_column)
+
+    with ThreadPoolExecutor(max_workers=len(MAPPING_TABLES)) as executor:
+        return dict(executor.map(load, MAPPING_TABLES.items()))
+
+def _read_snapshot():
+    if not os.path.exists(MAPPING_SNAPSHOT_PATH):
+        return None
+    try:
+        with open(MAPPING_SNAPSHOT_PATH, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading mapping snapshot, ignoring it: {str(e)}")
+        return None
+
+def _write_snapshot(mappings, versions):
+    try:
+        os.makedirs(os.path.dirname(MAPPING_SNAPSHOT_PATH), exist_ok=True)
+        tmp_path = temp_path(MAPPING_SNAPSHOT_PATH)
+        with open(tmp_path, 'w') as f:
+            json.dump({'versions': versions, 'saved_at': time.time(), 'mappings': mappings}, f)
+        os.replace(tmp_path, MAPPING_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"Error writing mapping snapshot: {str(e)}")
+
+def _snapshot_is_current(snapshot, versions):
+    if snapshot is None or set(snapshot.get('mappings', {})) != set(MAPPING_TABLES):
+        return False
+    if versions is not None:
+        return snapshot.get('versions') == versions
+    # Without recorded versions the snapshot is trusted as long as the old TTL
+    return time.time() - snapshot.get('saved_at', 0) < MAPPING_CACHE_TTL
+
+@st.cache_data(ttl=VERSIONED_CACHE_TTL)
+def _load_all_mappings(versions, expires):
+    snapshot = _read_snapshot()
+    if _snapshot_is_current(snapshot, versions):
+        print("Loaded mappings from local snapshot")
+        return snapshot['mappings']
+
+    supabase = get_admin_client()
+    try:
+        mappings = _load_via_rpc(supabase)
+    except Exception as e:
+        print(f"get_mappings() not available, loading mapping tables separately: {str(e)}")
+        mappings = _load_via_tables(supabase)
+    if not any(mappings.values()):
+        # Raised rather than returned, so st.cache_data does not keep the empty result
+        raise ValueError("The mapping tables returned no rows")
+
+    _write_snapshot(mappings, versions)
+    return mappings
+
+@st.cache_data(ttl=VERSIONED_CACHE_TTL)
+def _load_offline_mappings(versions):
+    """Mappings for DATA_BACKEND=sqlite: the last online snapshot, else the codes in the SQLite files"""
+    snapshot = _read_snapshot()
+    mappings = {name: {} for name in MAPPING_TABLES}
+    mappings.update(get_offline_mappings())
+    if snapshot:
+        # Real names where an earlier online run saved them
+        for name, names in snapshot.get('mappings', {}).items():
+            mappings.setdefault(name, {}).update(names)
+    print(f"Loaded offline mappings ({'with' if snapshot else 'without'} names from the local snapshot)")
+    return mappings
+
+def get_all_mappings():
+    """Get every code -> name mapping, keyed by mapping name (see MAPPING_TABLES)
+
+    Cached until one of the mapping tables is written again. Cold starts are
+    served from the local snapshot when it is still current.
+    """
+    if DATA_BACKEND == 'sqlite':
+        return _load_offline_mappings([offline_version(table) for table in ('deposito_data', 'tabungan_data', 'rahn_data')])
+    versions = recorded_version(*MAPPING_TABLE_NAMES)
+    versions = list(versions) if versions is not None else None
+    # Without versions the cache entry rolls over like the old one-hour TTL
+    expires = None if versions is not None else int(time.time() // MAPPING_CACHE_TTL)
+    try:
+        return _load_all_mappings(versions, expires)
+    except Exception as e:
+        print(f"Error fetching mappings: {str(e)}")
+        # A stale snapshot beats an empty dashboard; nothing is cached, the next call retries
+        snapshot = _read_snapshot()
+        return snapshot['mappings'] if snapshot else {name: {} for name in MAPPING_TABLES}
+
+def get_mapping(name):
+    """Get one code -> name mapping, e.g. get_mapping('branch')"""
+    return get_all_mappings().get(name, {})
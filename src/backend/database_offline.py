@@ -0,0 +1,212 @@
+import os
+import re
+import sqlite3
+import pandas as pd
+from src.backend.supabase_client import get_env_var
+
+# Where fact data is read from: 'supabase' (default) or 'sqlite' for the bundled
+# monthly snapshots, e.g. to run or load-test the dashboard without network latency
+DATA_BACKEND = get_env_var("DATA_BACKEND", "supabase").lower()
+SQLITE_DATA_DIR = get_env_var("SQLITE_DATA_DIR", "./database")
+# One indexed table per type, built by consolidate_sqlite.py; preferred over the monthly tables
+CONSOLIDATED_DB_PATH = get_env_var("SQLITE_CONSOLIDATED_DB", os.path.join(SQLITE_DATA_DIR, "ams_local.db"))
+# Layout of the consolidated store (its PRAGMA user_version); stores in an older
+# layout are ignored until consolidate_sqlite.py rebuilds them
+CONSOLIDATED_FORMAT = 2
+
+# Supabase table -> snapshot file, monthly table prefix, Tanggal format and
+# {Supabase column: snapshot column}. Tables are named <prefix>YYYYMM
+OFFLINE_SOURCES = {
+    'deposito_data': {
+        'file': 'deposito.db',
+        'prefix': 'DepositoData',
+        'date_format': '%Y-%m-%d',
+        'columns': {'tanggal': 'Tanggal', 'kode_cabang': 'KodeCabang',
+                    'kode_produk': 'KodeProduk', 'nominal': 'Nominal'},
+    },
+    'tabungan_data': {
+        'file': 'saving.db',
+        'prefix': 'SavingData',
+        'date_format': '%Y-%m-%d',
+        'columns': {'tanggal': 'Tanggal', 'kode_cabang': 'KodeCabang',
+                    'kode_produk': 'KodeProduk', 'nominal': 'Nominal'},
+    },
+    'rahn_data': {
+        'file': 'rahn.db',
+        'prefix': 'RahnData',
+        # RahnData stores Tanggal (and Kolektibilitas) as TEXT, e.g. '20210601'
+        'date_format': '%Y%m%d',
+        'columns': {'tanggal': 'Tanggal', 'kode_cabang': 'KodeCabang', 'kode_produk': 'KodeProduk',
+                    'nominal': 'Nominal', 'kolektibilitas': 'Kolektibilitas'},
+    },
+}
+
+def _snapshot_path(table_name):
+    source = OFFLINE_SOURCES.get(table_name)
+    return os.path.join(SQLITE_DATA_DIR, source['file']) if source else None
+
+def _connect(path):
+    # Read-only, so a running dashboard can never modify the snapshots
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+def monthly_tables(conn, prefix, start=None, end=None, schema='main'):
+    """Names of the <prefix>YYYYMM tables whose month overlaps [start, end] (all if None), oldest first"""
+    pattern = re.compile(rf"^{prefix}(\d{{6}})$")
+    first_month = start.strftime('%Y%m') if start is not None else '000000'
+    last_month = end.strftime('%Y%m') if end is not None else '999999'
+    tables = []
+    for (name,) in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'"):
+        match = pattern.match(name)
+        if match and first_month <= match.group(1) <= last_month:
+            tables.append(name)
+    return sorted(tables)
+
+def to_day_number(day):
+    """Days since 1970-01-01, the tanggal stored in the consolidated store"""
+    return (pd.Timestamp(day).normalize() - pd.Timestamp('1970-01-01')).days
+
+def _has_consolidated(table_name):
+    """True if the consolidated store exists in the current layout and holds table_name"""
+    if not os.path.exists(CONSOLIDATED_DB_PATH):
+        return False
+    try:
+        conn = _connect(CONSOLIDATED_DB_PATH)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != CONSOLIDATED_FORMAT:
+                print(f"{CONSOLIDATED_DB_PATH} has an old layout, rebuild it with consolidate_sqlite.py")
+                return False
+            return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                (table_name,)).fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+def offline_version(table_name):
+    """Modification times of a table's snapshot file and the consolidated store, for cache keys"""
+    return (_mtime(_snapshot_path(table_name)), _mtime(CONSOLIDATED_DB_PATH))
+
+def _in_conditions(*column_values):
+    """WHERE conditions and parameters for (column, values) pairs; None values add no condition"""
+    conditions, params = [], []
+    for column, values in column_values:
+        if values is not None:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return conditions, params
+
+def _read_consolidated(table_name, columns, start, end, branches, products):
+    """One indexed range scan over the consolidated table, with tanggal as day numbers"""
+    conditions, params = _in_conditions(('kode_cabang', branches), ('kode_produk', products))
+    where = " AND ".join(["tanggal >= ?", "tanggal <= ?"] + conditions)
+    sql = f"SELECT {', '.join(columns)} FROM {table_name} WHERE {where}"
+    conn = _connect(CONSOLIDATED_DB_PATH)
+    try:
+        print(f"Reading {table_name} from {os.path.basename(CONSOLIDATED_DB_PATH)}")
+        return [pd.read_sql_query(sql, conn, params=[to_day_number(start), to_day_number(end)] + params)]
+    finally:
+        conn.close()
+
+def _read_monthly(table_name, source, columns, start, end, branches, products):
+    """Query only the monthly tables overlapping the range"""
+    conditions, params = _in_conditions(('KodeCabang', branches), ('KodeProduk', products))
+    # Half-open date range written in the table's own Tanggal format, so it can be compared as text
+    where = " AND ".join(["Tanggal >= ?", "Tanggal < ?"] + conditions)
+    params = [start.strftime(source['date_format']),
+              (end + pd.Timedelta(days=1)).strftime(source['date_format'])] + params
+    select_list = ", ".join(f"{source['columns'][col]} AS {col}" for col in columns)
+    conn = _connect(_snapshot_path(table_name))
+    try:
+        # Some monthly tables also hold the first day of the next month, so the
+        # table of the month before start is read as well
+        tables = monthly_tables(conn, source['prefix'], start - pd.DateOffset(months=1), end)
+        print(f"Reading {table_name} from {len(tables)} monthly tables in {source['file']}")
+        return [
+            pd.read_sql_query(f"SELECT {select_list} FROM {table} WHERE {where}", conn, params=params)
+            for table in tables
+        ]
+    finally:
+        conn.close()
+
+def get_offline_data(table_name, start_date, end_date, columns, aggregate=None, branches=None, products=None):
+    """Read a fact table from the SQLite snapshots, shaped like get_cached_data's result
+
+    Reads the consolidated store when it has the table (see consolidate_sqlite.py),
+    otherwise only the monthly tables overlapping the range. Date, branch and
+    product filters are pushed into the WHERE clauses either way.
+
+    Args:
+        columns (list): Supabase column names; those missing from the snapshots are skipped
+        aggregate (bool): Ignored, the snapshots already hold daily totals
+        branches, products (tuple): Only return rows for these codes (None = all)
+    """
+    # Imported here, database_utils depends on the mappings which depend on this module
+    from src.backend.database_utils import apply_fact_schema
+
+    source = OFFLINE_SOURCES.get(table_name)
+    if source is None:
+        print(f"No SQLite snapshot for {table_name}, returning no rows")
+        return pd.DataFrame()
+    if branches == () or products == ():
+        return pd.DataFrame()
+
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    columns = [col for col in columns if col in source['columns']]
+    # Read errors are raised like get_cached_data's, so the loaders do not cache them
+    if _has_consolidated(table_name):
+        frames = _read_consolidated(table_name, columns, start, end, branches, products)
+        date_format = None
+    elif os.path.exists(_snapshot_path(table_name)):
+        frames = _read_monthly(table_name, source, columns, start, end, branches, products)
+        date_format = 'ISO8601' if source['date_format'] == '%Y-%m-%d' else source['date_format']
+    else:
+        print(f"SQLite snapshot {_snapshot_path(table_name)} not found")
+        return pd.DataFrame()
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if date_format is None:
+        # Day numbers map onto datetime64 without parsing
+        df['tanggal'] = df['tanggal'].to_numpy(dtype='int64').astype('datetime64[D]').astype('datetime64[ns]')
+    else:
+        # The monthly tables store Tanggal as TEXT
+        df['tanggal'] = pd.to_datetime(df['tanggal'], format=date_format)
+    return apply_fact_schema(df, label=f"{table_name} (sqlite)")
+
+def get_offline_mappings():
+    """Code -> code mappings for the codes present in the snapshots
+
+    Used when no mapping snapshot from an earlier online run exists, so the
+    branch and product selectors still work offline (showing codes as names).
+    """
+    codes = {'branch': set(), 'deposito_product': set(), 'tabungan_product': set(), 'rahn_product': set()}
+    product_mapping = {'deposito_data': 'deposito_product', 'tabungan_data': 'tabungan_product',
+                       'rahn_data': 'rahn_product'}
+    for table_name, source in OFFLINE_SOURCES.items():
+        consolidated = _has_consolidated(table_name)
+        path = CONSOLIDATED_DB_PATH if consolidated else _snapshot_path(table_name)
+        if not os.path.exists(path):
+            continue
+        conn = _connect(path)
+        try:
+            if consolidated:
+                queries = [f"SELECT DISTINCT kode_cabang, kode_produk FROM {table_name}"]
+            else:
+                queries = [f"SELECT DISTINCT KodeCabang, KodeProduk FROM {table}"
+                           for table in monthly_tables(conn, source['prefix'])]
+            for sql in queries:
+                for branch, product in conn.execute(sql):
+                    codes['branch'].add(branch)
+                    codes[product_mapping[table_name]].add(product)
+        finally:
+            conn.close()
+    return {name: {code: code for code in sorted(values)} for name, values in codes.items()}
@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+from src.backend.supabase_client import get_supabase_client
+
+# The schema the dashboard is deployed with, read instead of probing the server
+SETUP_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supabase_setup.sql')
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE (?:IF NOT EXISTS\s+)?(\w+)\s*\((.*?)\n\);", re.S | re.I)
+_CREATE_VIEW = re.compile(r"CREATE MATERIALIZED VIEW (?:IF NOT EXISTS\s+)?(\w+)\s+AS\s+SELECT\s+(.*?)\s+FROM\s", re.S | re.I)
+_CONSTRAINT_KEYWORDS = ('PRIMARY', 'UNIQUE', 'CONSTRAINT', 'FOREIGN', 'CHECK')
+
+# table or view -> list of columns, shared by every session in the process
+_schemas = {}
+_schemas_lock = threading.Lock()
+# mtime of supabase_setup.sql when _schemas was loaded; a change reloads the registry
+_loaded_signature = None
+
+def _split_top_level(text):
+    """Split on commas that are not inside parentheses, e.g. DECIMAL(18,2)"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        depth += (char == '(') - (char == ')')
+        current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+def _strip_comments(text):
+    return re.sub(r"--[^\n]*", "", text)
+
+def parse_setup_sql(path=SETUP_SQL_PATH):
+    """Return {name: [columns]} for the tables and materialized views in a setup script"""
+    with open(path, 'r') as f:
+        sql = _strip_comments(f.read())
+
+    schemas = {}
+    for name, body in _CREATE_TABLE.findall(sql):
+        schemas[name] = [
+            definition.split()[0] for definition in _split_top_level(body)
+            if definition.split()[0].upper() not in _CONSTRAINT_KEYWORDS
+        ]
+    for name, select_list in _CREATE_VIEW.findall(sql):
+        # Use the alias of computed columns, e.g. SUM(nominal) AS nominal
+        schemas[name] = [
+            re.split(r"\s+AS\s+", item, flags=re.I)[-1].strip()
+            for item in _split_top_level(select_list)
+        ]
+    return schemas
+
+def _sql_signature():
+    try:
+        return os.stat(SETUP_SQL_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def _ensure_loaded():
+    global _loaded_signature
+    signature = _sql_signature()
+    if signature is not None and signature == _loaded_signature:
+        return
+    with _schemas_lock:
+        if signature is not None and signature == _loaded_signature:
+            return
+        try:
+            parsed = parse_setup_sql() if signature is not None else {}
+            print(f"Loaded schema of {len(parsed)} tables from {os.path.basename(SETUP_SQL_PATH)}")
+        except Exception as e:
+            print(f"Could not parse {SETUP_SQL_PATH}, tables will be introspected: {str(e)}")
+            parsed = {}
+        _schemas.clear()
+        _schemas.update(parsed)
+        _loaded_signature = signature
+
+def is_missing_table_error(error):
+    """True if a PostgREST error says the table or view itself does not exist"""
+    message = str(error).lower()
+    if 'could not find the table' in message:
+        return True
+    return 'does not exist' in message and 'column' not in message
+
+def _introspect(table_name):
+    """Read one row to learn the columns of a table missing from the setup script"""
+    supabase = get_supabase_client(use_service_role=True)
+    response = supabase.table(table_name).select('*').limit(1).execute()
+    # An empty table tells us nothing; it is introspected again next time
+    return list(response.data[0].keys()) if response.data else None
+
+def get_table_columns(table_name):
+    """Get the known columns of a table or view
+
+    Tables come from supabase_setup.sql, reloaded whenever the file changes.
+    Tables not in the script, or invalidated since it was loaded, are
+    introspected once and remembered.
+
+    Returns:
+        list: Column names, or None if the columns could not be determined
+
+    Raises:
+        LookupError: If the table does not exist on the server
+    """
+    _ensure_loaded()
+    columns = _schemas.get(table_name)
+    if columns is not None:
+        return columns
+
+    try:
+        columns = _introspect(table_name)
+    except Exception as e:
+        if is_missing_table_error(e):
+            raise LookupError(f"Table {table_name} does not exist") from e
+        print(f"Error checking table structure for {table_name}: {str(e)}")
+        return None
+
+    if columns is not None:
+        print(f"Table {table_name} exists with columns: {columns}")
+        with _schemas_lock:
+            _schemas[table_name] = columns
+    return columns
+
+def invalidate_schema(table_name=None):
+    """Forget the schema of one table (or all), e.g. after a query against it failed
+
+    The setup script is not re-read, it would give back the same columns; the
+    next lookup introspects the server instead, until the script changes.
+    """
+    with _schemas_lock:
+        if table_name is None:
+            _schemas.clear()
+        else:
+            _schemas.pop(table_name, None)
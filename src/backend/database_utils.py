@@ -1,7 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+import hashlib
+import threading
+import time
+import numpy as np
 import pandas as pd
 import streamlit as st
-from src.backend.supabase_client import get_supabase_client
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from src.backend.supabase_client import get_supabase_client, get_env_var
+from src.backend.database_branch import get_branch_mapping
+from src.backend.database_versions import data_version, recorded_version, VERSIONED_CACHE_TTL
+from src.backend.frame_cache import cache_frames
+from src.backend.database_schema import get_table_columns, invalidate_schema, is_missing_table_error
+from src.backend.database_cache import get_partitioned_data, LOCAL_CACHE_ENABLED, WATERMARK_COLUMN, SCOPE_PREFIX
+
+# Concurrency and retry settings for windowed fetches
+FETCH_MAX_WORKERS = int(get_env_var("FETCH_MAX_WORKERS", 4))
+FETCH_MAX_RETRIES = int(get_env_var("FETCH_MAX_RETRIES", 3))
+FETCH_RETRY_BACKOFF = float(get_env_var("FETCH_RETRY_BACKOFF", 0.5))  # seconds, grows per attempt
+
+# Pagination settings: rows per request (keep <= PostgREST max-rows) and window sizing
+FETCH_PAGE_SIZE = int(get_env_var("FETCH_PAGE_SIZE", 1000))
+TARGET_WINDOW_ROWS = int(get_env_var("TARGET_WINDOW_ROWS", 10000))
+MAX_WINDOW_DAYS = int(get_env_var("MAX_WINDOW_DAYS", 92))
+
+# Read daily aggregate views instead of raw rows when a loader only needs group totals
+USE_AGGREGATE_VIEWS = get_env_var("USE_AGGREGATE_VIEWS", "true").lower() == "true"
+
+# Daily aggregate views (see supabase_setup.sql); their columns come from the schema registry
+AGGREGATE_VIEWS = {
+    'deposito_data': 'deposito_data_daily',
+    'tabungan_data': 'tabungan_data_daily',
+    'pembiayaan_data': 'pembiayaan_data_daily',
+    'rahn_data': 'rahn_data_daily',
+}
+
+# Tables or views reported missing by the server, so callers can fall back
+_missing_tables = set()
 
 def handle_db_errors(default_return=None):
     """Decorator for handling database errors consistently"""
@@ -18,28 +53,30 @@ def handle_db_errors(default_return=None):
         return wrapper
     return decorator
 
-@st.cache_data(ttl=3600)
-def get_all_mappings():
-    """Get all mappings in one call to reduce network requests"""
-    try:
-        supabase = get_supabase_client()
-        
-        # Execute all requests
-        branch_response = supabase.table('branch_mapping').select('kode_cabang, nama_cabang').execute()
-        grup1_response = supabase.table('grup1_mapping').select('kode_grup1, nama_grup').execute()
-        grup2_response = supabase.table('grup2_mapping').select('kode_grup2, nama_grup').execute()
-        
-        return {
-            'branches': {row['kode_cabang']: row['nama_cabang'] 
-                        for row in branch_response.data} if branch_response.data else {},
-            'grup1': {row['kode_grup1']: row['nama_grup'] 
-                     for row in grup1_response.data} if grup1_response.data else {},
-            'grup2': {row['kode_grup2']: row['nama_grup'] 
-                     for row in grup2_response.data} if grup2_response.data else {}
-        }
-    except Exception as e:
-        print(f"Error fetching mappings: {str(e)}")
-        return {'branches': {}, 'grup1': {}, 'grup2': {}}
+def build_cube(df, measures, label=None):
+    """Sum the measure columns over every other column (date, branch, product, ...)
+
+    The cube keeps the input's columns and dtypes, so every sum the tabs compute
+    from raw rows gives the same result from the cube, at a cost that depends on
+    the number of distinct dimension combinations instead of the raw row count.
+    Frames read from the daily aggregate views are cubes already (see
+    reads_daily_totals).
+
+    Args:
+        df (pd.DataFrame): Validated fact frame
+        measures (list): Amount columns to sum; missing ones are ignored
+        label (str): Name used in the size report
+    """
+    measures = [col for col in measures if col in df.columns]
+    if df.empty or not measures:
+        return df
+    dimensions = [col for col in df.columns if col not in measures]
+    # dropna=False keeps rows whose group or collector code is missing
+    cube = df.groupby(dimensions, observed=True, dropna=False, sort=False)[measures].sum().reset_index()
+    cube = cube.sort_values('Tanggal', kind='stable').reset_index(drop=True)[list(df.columns)]
+    if label:
+        print(f"Built {label} cube: {len(df)} rows -> {len(cube)} cells")
+    return cube
 
 def validate_funding_data(df):
     """Validate funding data structure and types"""
@@ -56,137 +93,568 @@ def validate_lending_data(df):
         print(f"ERROR: Missing required columns in lending data: {missing_cols}")
         raise ValueError(f"Missing required columns in lending data: {missing_cols}")
     
-    # Check for additional expected columns based on data type
+    # Types were set by apply_fact_schema; only missing amounts still need filling
     if 'Outstanding' in df.columns:
-        # This is pembiayaan data, ensure Outstanding is numeric
-        df['Outstanding'] = pd.to_numeric(df['Outstanding'], errors='coerce').fillna(0)
-        print(f"Validated Outstanding column in pembiayaan data")
+        # This is pembiayaan data
+        df['Outstanding'] = df['Outstanding'].fillna(0)
     elif 'Nominal' in df.columns:
-        # This is rahn data, ensure Nominal is numeric
-        df['Nominal'] = pd.to_numeric(df['Nominal'], errors='coerce').fillna(0)
-        print(f"Validated Nominal column in rahn data")
-    
-    # Ensure Tanggal is datetime
-    if 'Tanggal' in df.columns:
-        df['Tanggal'] = pd.to_datetime(df['Tanggal'], errors='coerce')
-        # Remove any rows with invalid dates
-        invalid_dates = df['Tanggal'].isna().sum()
-        if invalid_dates > 0:
-            print(f"WARNING: Removed {invalid_dates} rows with invalid dates")
-            df = df.dropna(subset=['Tanggal'])
-    
-    # Ensure KodeCabang and KodeProduk are strings
-    if 'KodeCabang' in df.columns:
-        df['KodeCabang'] = df['KodeCabang'].astype(str)
-    
-    if 'KodeProduk' in df.columns:
-        df['KodeProduk'] = df['KodeProduk'].astype(str)
+        # This is rahn data
+        df['Nominal'] = df['Nominal'].fillna(0)
+    
+    # Remove any rows with invalid dates
+    invalid_dates = df['Tanggal'].isna().sum()
+    if invalid_dates > 0:
+        print(f"WARNING: Removed {invalid_dates} rows with invalid dates")
+        df = df.dropna(subset=['Tanggal'])
+    
+    return df
+
+# Columns that order rows deterministically for offset paging
+PAGE_ORDER_COLUMNS = ['tanggal', 'kode_cabang', 'kode_produk']
+
+# Compact schema for fact frames: datetime64 day dates, categorical codes,
+# int8 collectibility levels (1-5, missing as 0) and float64 amounts
+DATE_COLUMNS = {'tanggal'}
+CODE_COLUMNS = {'kode_cabang', 'kode_produk', 'kode_grup1', 'kode_grup2', 'kd_kolektor', 'kd_sts_pemb'}
+LEVEL_COLUMNS = {'kolektibilitas'}
+AMOUNT_HINTS = ['outstanding', 'nominal', 'jml', 'pencairan', 'pokok']
+
+def _column_kind(column):
+    if column in DATE_COLUMNS:
+        return 'date'
+    if column in CODE_COLUMNS:
+        return 'code'
+    if column in LEVEL_COLUMNS:
+        return 'level'
+    if any(hint in column.lower() for hint in AMOUNT_HINTS):
+        return 'amount'
+    return 'object'
+
+def _frame_memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def apply_fact_schema(df, label=None):
+    """Convert a fact frame to the compact schema in place of ad-hoc conversions downstream
+
+    Columns already in their compact dtype are left alone, so frames typed at
+    ingestion (TypedFrameBuilder, the local Parquet cache) are not parsed again.
+    Date columns are expected to hold whole days once they are datetime64.
+
+    Args:
+        df (pd.DataFrame): Frame with Supabase (lowercase) column names
+        label (str): Name used in the memory report; no report is printed without it
+    """
+    if df.empty:
+        return df
+    before = _frame_memory_mb(df) if label else None
     
+    for col in df.columns:
+        kind = _column_kind(col)
+        dtype = df[col].dtype
+        if kind == 'date' and not pd.api.types.is_datetime64_dtype(dtype):
+            df[col] = pd.to_datetime(df[col]).dt.normalize()
+        elif kind == 'code' and not isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        elif kind == 'level' and dtype != 'int8':
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int8')
+        elif kind == 'amount' and dtype != 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    
+    if label:
+        print(f"Memory for {label}: {before:.1f} MB -> {_frame_memory_mb(df):.1f} MB ({len(df)} rows)")
     return df
 
-def get_data_in_batches(table_name, start_date, end_date, columns, batch_size=30):
-    """Get data in batches for large date ranges"""
+def concat_fact_frames(frames):
+    """Concatenate typed fact frames without losing their categorical code columns
+
+    pd.concat turns categoricals with different categories into object columns,
+    which would then have to be encoded again. The categories are unioned first,
+    so only the integer codes are remapped.
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    dtypes = {}
+    for col in frames[0].columns:
+        if all(col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = frames[0][col].cat.categories
+            for frame in frames[1:]:
+                categories = categories.union(frame[col].cat.categories)
+            dtypes[col] = pd.CategoricalDtype(categories)
+    if dtypes and len(frames) > 1:
+        frames = [frame.astype(dtypes) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+class TypedFrameBuilder:
+    """Collect query pages straight into typed column arrays
+
+    Each page of row dicts is split into one array per column as soon as it
+    arrives (datetime64 dates, float64 amounts), so the dicts can be freed
+    page by page instead of piling up until the whole range is loaded.
+    Code and level columns get their compact dtypes when the frame is built.
+    """
+    
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.row_count = 0
+        self._chunks = {col: [] for col in self.columns}
+    
+    def append(self, rows):
+        """Add a page of row dicts as returned by PostgREST"""
+        if not rows:
+            return
+        self._append_values({col: [row.get(col) for row in rows] for col in self.columns}, len(rows))
+    
+    def append_rows(self, rows):
+        """Add a chunk of row tuples in column order, e.g. from a DB-API fetchmany()"""
+        if not rows:
+            return
+        self._append_values(dict(zip(self.columns, zip(*rows))), len(rows))
+    
+    def _append_values(self, values_by_column, row_count):
+        for col in self.columns:
+            values = list(values_by_column[col])
+            kind = _column_kind(col)
+            if kind == 'date':
+                array = pd.to_datetime(values, errors='coerce', format='ISO8601').to_numpy()
+            elif kind in ('amount', 'level'):
+                array = np.asarray(pd.to_numeric(values, errors='coerce'), dtype='float64')
+            else:
+                array = np.array(values, dtype=object)
+            self._chunks[col].append(array)
+        self.row_count += row_count
+    
+    def extend(self, other):
+        """Take over the arrays of another builder with the same columns"""
+        for col in self.columns:
+            self._chunks[col].extend(other._chunks[col])
+        self.row_count += other.row_count
+    
+    def build(self):
+        """Concatenate the collected arrays into a DataFrame"""
+        empty = {'date': 'datetime64[ns]', 'amount': 'float64', 'level': 'float64'}
+        data = {}
+        for col in self.columns:
+            chunks = self._chunks[col]
+            kind = _column_kind(col)
+            array = np.concatenate(chunks) if chunks else np.array([], dtype=empty.get(kind, object))
+            if kind == 'code':
+                array = pd.Categorical(array)
+            elif kind == 'level':
+                array = np.nan_to_num(array, nan=0).astype('int8')
+            data[col] = array
+        return pd.DataFrame(data, columns=self.columns)
+
+# Rows per day observed per table (and filter set), used to size the next load's windows
+_rows_per_day = {}
+_rows_per_day_lock = threading.Lock()
+
+def _execute_with_retry(build_query, label, max_retries):
+    """Execute a query built by build_query, retrying with backoff. Returns None on failure"""
+    for attempt in range(1, max_retries + 1):
+        try:
+            return build_query().execute()
+        except Exception as e:
+            if is_missing_table_error(e):
+                # Retrying cannot help, let the loader fall back or give up
+                raise LookupError(str(e)) from e
+            print(f"Error fetching {label} (attempt {attempt}/{max_retries}): {str(e)}")
+            if attempt < max_retries:
+                time.sleep(FETCH_RETRY_BACKOFF * attempt)
+    return None
+
+def normalize_filter(values):
+    """Turn a list of codes into a sorted tuple usable as a cache key (None = no filter)"""
+    if values is None:
+        return None
+    return tuple(sorted({str(value) for value in values}))
+
+def normalize_branch_filter(branches):
+    """Normalize a branch selection, dropping it when it covers every known branch"""
+    branches = normalize_filter(branches)
+    if not branches:
+        return branches
+    try:
+        all_branches = set(get_branch_mapping().keys())
+    except Exception as e:
+        print(f"Could not load branch list to normalize filter: {str(e)}")
+        return branches
+    if all_branches and all_branches <= set(branches):
+        return None
+    return branches
+
+def _value_filters(branches=None, products=None):
+    """Build the kode_cabang/kode_produk IN filters passed to _fetch_window"""
+    filters = []
+    if branches is not None:
+        filters.append(('in_', 'kode_cabang', list(branches)))
+    if products is not None:
+        filters.append(('in_', 'kode_produk', list(products)))
+    return filters
+
+def _filter_scope(filters):
+    """Short, filesystem-safe name for a filter set, used to separate cached partitions"""
+    if not filters:
+        return None
+    scope = '__'.join(f"{column}={'_'.join(values)}" for _, column, values in filters)
+    if len(scope) > 64:
+        scope = hashlib.sha1(scope.encode('utf-8')).hexdigest()[:16]
+    return f"{SCOPE_PREFIX}{scope}"
+
+def _rate_key(table_name, filters=None):
+    """Key rows/day estimates by table and filter set, since filters shrink the row count"""
+    if not filters:
+        return table_name
+    return (table_name, tuple((column, tuple(values)) for _, column, values in filters))
+
+def _record_rows_per_day(rate_key, row_count, days):
+    """Blend an observed rows/day figure into the running estimate for rate_key"""
+    if days <= 0:
+        return
+    observed = row_count / days
+    with _rows_per_day_lock:
+        previous = _rows_per_day.get(rate_key)
+        _rows_per_day[rate_key] = observed if previous is None else 0.5 * previous + 0.5 * observed
+
+def _estimate_rows_per_day(supabase, table_name, start_date, end_date, filters=None):
+    """Use the planner's row estimate to seed rows/day for a table we have not read yet"""
+    try:
+        query = supabase.table(table_name) \
+            .select('tanggal', count='estimated') \
+            .gte('tanggal', start_date.strftime('%Y-%m-%d')) \
+            .lt('tanggal', end_date.strftime('%Y-%m-%d'))
+        for method, column, value in filters or []:
+            query = getattr(query, method)(column, value)
+        response = query.limit(1).execute()
+        if response.count is not None:
+            _record_rows_per_day(_rate_key(table_name, filters), response.count, (end_date - start_date).days)
+    except Exception as e:
+        print(f"Could not estimate row count for {table_name}: {str(e)}")
+
+def _plan_windows(table_name, start_date, end_date, default_days, filters=None):
+    """Split [start_date, end_date] into [start, end) windows sized from observed rows/day"""
+    rate = _rows_per_day.get(_rate_key(table_name, filters))
+    if rate:
+        window_days = int(min(MAX_WINDOW_DAYS, max(1, TARGET_WINDOW_ROWS // max(rate, 1))))
+    else:
+        window_days = default_days
+    print(f"Planning {table_name} windows of {window_days} days (rows/day estimate: {rate})")
+    
+    windows = []
+    current_date = start_date
+    while current_date <= end_date:
+        next_date = min(current_date + pd.Timedelta(days=window_days), end_date + pd.Timedelta(days=1))
+        windows.append((current_date, next_date))
+        current_date = next_date
+    return windows
+
+def _fetch_window(supabase, table_name, columns, window_start, window_end,
+                  max_retries=FETCH_MAX_RETRIES, page_size=FETCH_PAGE_SIZE, filters=None, rate_key=None):
+    """Fetch one [window_start, window_end) date window, paging past the PostgREST row cap
+
+    Args:
+        filters (list): Extra (method, column, value) filters, e.g. ('gt', 'updated_at', since)
+        rate_key: Rows/day estimate to update with this window's row count, if any
+
+    Returns:
+        tuple: (TypedFrameBuilder, complete) where complete is False if the window could not be read in full
+    """
+    label = f"batch {window_start.strftime('%Y-%m-%d')} to {window_end.strftime('%Y-%m-%d')}"
+    # Order by the key first and then every other selected column, so that
+    # offset pages are stable between requests even though the key is not unique
+    order_columns = [col for col in PAGE_ORDER_COLUMNS if col in columns] + \
+                    [col for col in columns if col not in PAGE_ORDER_COLUMNS]
+    
+    def build_page_query(offset, with_count):
+        query = supabase.table(table_name) \
+            .select(','.join(columns), count='exact' if with_count else None) \
+            .gte('tanggal', window_start.strftime('%Y-%m-%d')) \
+            .lt('tanggal', window_end.strftime('%Y-%m-%d'))
+        for method, column, value in filters or []:
+            query = getattr(query, method)(column, value)
+        for col in order_columns:
+            query = query.order(col)
+        return query.range(offset, offset + page_size - 1)
+    
+    rows = TypedFrameBuilder(columns)
+    expected = None
+    complete = True
+    while expected is None or rows.row_count < expected:
+        offset = rows.row_count
+        response = _execute_with_retry(lambda: build_page_query(offset, expected is None), label, max_retries)
+        if response is None:
+            # Continue with the other batches instead of failing completely
+            print(f"WARNING: Giving up on {label} after {max_retries} attempts "
+                  f"({rows.row_count} of {expected if expected is not None else '?'} rows fetched)")
+            complete = False
+            break
+        if expected is None:
+            expected = response.count if response.count is not None else float('inf')
+        if not response.data:
+            break
+        rows.append(response.data)
+    
+    if expected not in (None, float('inf')) and rows.row_count != expected:
+        print(f"WARNING: {label} returned {rows.row_count} rows, expected {expected}")
+        complete = False
+    print(f"{label.capitalize()}: found {rows.row_count} records")
+    if rate_key is not None:
+        _record_rows_per_day(rate_key, rows.row_count, (window_end - window_start).days)
+    return rows, complete
+
+def get_data_in_batches(table_name, start_date, end_date, columns, batch_size=30,
+                        max_workers=FETCH_MAX_WORKERS, max_retries=FETCH_MAX_RETRIES, strict=False,
+                        filters=None):
+    """Get data in batches for large date ranges
+
+    Args:
+        table_name (str): Supabase table to read
+        start_date, end_date: Inclusive date range
+        columns (list): Columns to select
+        batch_size (int): Days per request window until a rows/day estimate exists
+        max_workers (int): Number of windows fetched concurrently (1 = serial)
+        max_retries (int): Attempts per window before it is skipped
+        strict (bool): Raise instead of returning partial data when a window fails
+            or the table does not exist (LookupError), for callers that persist results
+        filters (list): (method, column, value) filters applied server-side, see _value_filters
+    """
     try:
         supabase = get_supabase_client(use_service_role=True)  # Use service role for data access
-        all_data = []
         current_date = pd.Timestamp(start_date)
         end_date = pd.Timestamp(end_date)
         
         print(f"Fetching {table_name} from {current_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
         
-        # First, check if the table exists and verify columns
-        try:
-            # Get a small sample to check structure
-            sample_query = supabase.table(table_name).select(','.join(columns)).limit(1)
-            sample_response = sample_query.execute()
-            
-            if sample_response.data:
-                print(f"Table {table_name} exists with columns: {list(sample_response.data[0].keys())}")
-                # Check if all requested columns exist
-                missing_columns = [col for col in columns if col not in sample_response.data[0]]
-                if missing_columns:
-                    print(f"WARNING: Columns {missing_columns} not found in {table_name}")
-            else:
-                print(f"Table {table_name} exists but is empty or columns don't match")
-                
-        except Exception as e:
-            print(f"Error checking table structure for {table_name}: {str(e)}")
-            if "does not exist" in str(e).lower():
-                print(f"ERROR: Table {table_name} does not exist!")
-                return pd.DataFrame()
+        # Check the requested columns against the schema registry instead of probing the server
+        known_columns = get_table_columns(table_name)
+        if known_columns is not None:
+            missing_columns = [col for col in columns if col not in known_columns]
+            if missing_columns:
+                print(f"WARNING: Columns {missing_columns} not found in {table_name}, skipping them")
+                columns = [col for col in columns if col in known_columns]
         
-        while current_date <= end_date:
-            next_date = min(current_date + pd.Timedelta(days=batch_size), end_date + pd.Timedelta(days=1))
-            
-            # Debug print
-            print(f"Batch: {current_date.strftime('%Y-%m-%d')} to {next_date.strftime('%Y-%m-%d')}")
-            
-            try:
-                # Get batch of data - use >= and < operators for clearer date range
-                query = supabase.table(table_name) \
-                    .select(','.join(columns)) \
-                    .gte('tanggal', current_date.strftime('%Y-%m-%d')) \
-                    .lt('tanggal', next_date.strftime('%Y-%m-%d'))
-                    
-                # Execute query and get data
-                response = query.execute()
-                
-                if response.data:
-                    print(f"Found {len(response.data)} records")
-                    all_data.extend(response.data)
-                else:
-                    print(f"No data found for this batch")
-            except Exception as batch_error:
-                print(f"Error fetching batch {current_date.strftime('%Y-%m-%d')} to {next_date.strftime('%Y-%m-%d')}: {str(batch_error)}")
-                # Continue to next batch instead of failing completely
-            
-            current_date = next_date
+        # Split the range into windows sized to stay near TARGET_WINDOW_ROWS
+        rate_key = _rate_key(table_name, filters)
+        if rate_key not in _rows_per_day:
+            _estimate_rows_per_day(supabase, table_name, current_date, end_date + pd.Timedelta(days=1), filters)
+        windows = _plan_windows(table_name, current_date, end_date, batch_size, filters)
+        
+        def fetch(window):
+            return _fetch_window(supabase, table_name, columns, window[0], window[1], max_retries,
+                                 filters=filters, rate_key=rate_key)
+        
+        workers = max(1, min(max_workers, len(windows)))
+        if workers == 1:
+            results = [fetch(window) for window in windows]
+        else:
+            print(f"Fetching {len(windows)} batches with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() yields results in submission order, so windows stay in date order
+                results = list(executor.map(fetch, windows))
+        
+        if not all(complete for _, complete in results):
+            # The registry may be out of date, introspect the table on the next load
+            invalidate_schema(table_name)
+        if strict and not all(complete for _, complete in results):
+            raise RuntimeError(f"Incomplete fetch of {table_name}, refusing to return partial data")
+        # Windows were typed as they streamed in, so only their arrays are joined here
+        builder = TypedFrameBuilder(columns)
+        for batch, _ in results:
+            builder.extend(batch)
             
-        if not all_data:
+        if builder.row_count == 0:
             print(f"WARNING: No data found in {table_name} for the entire date range")
             return pd.DataFrame()
         
-        # Create DataFrame from collected data
-        df = pd.DataFrame(all_data)
-        
-        # Check data types and try to convert numeric columns
-        for col in df.columns:
-            try:
-                # If column name suggests it's numeric and contains string values, try to convert
-                if any(hint in col.lower() for hint in ['outstanding', 'nominal', 'jml', 'pencairan', 'pokok']):
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    print(f"Converted {col} to numeric")
-            except Exception as e:
-                print(f"Could not convert {col} to numeric: {str(e)}")
-                
-        return df
+        return builder.build()
         
+    except LookupError:
+        print(f"ERROR: Table {table_name} does not exist!")
+        _missing_tables.add(table_name)
+        invalidate_schema(table_name)
+        if strict:
+            raise
+        return pd.DataFrame()
     except Exception as e:
+        invalidate_schema(table_name)
+        if strict:
+            raise
         print(f"ERROR in batch retrieval for {table_name}: {str(e)}")
         import traceback
         traceback.print_exc()
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600, max_entries=100)
-def get_cached_data(table_name, start_date, end_date, columns, granularity='D'):
-    """Get cached data with granularity control"""
+def get_changed_rows(table_name, start_date, end_date, since, filters=None):
+    """Get tanggal/updated_at of rows in [start_date, end_date] updated after `since`"""
+    supabase = get_supabase_client(use_service_role=True)
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    changes, complete = _fetch_window(
+        supabase, table_name, ['tanggal', WATERMARK_COLUMN], start, end,
+        filters=list(filters or []) + [('gt', WATERMARK_COLUMN, pd.Timestamp(since).isoformat())]
+    )
+    if not complete:
+        raise RuntimeError(f"Could not read changed rows of {table_name}")
+    return changes.build()
+
+def get_day_counts(table_name, start_date, end_date, filters=None):
+    """Get tanggal/row_count per day in [start_date, end_date] from the cache_day_counts function"""
+    supabase = get_supabase_client(use_service_role=True)
+    params = {
+        'p_table_name': table_name,
+        'p_start': pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+        'p_end': pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+    }
+    for _, column, values in filters or []:
+        params['p_branches' if column == 'kode_cabang' else 'p_products'] = list(values)
+    rows = []
+    while True:
+        response = supabase.rpc('cache_day_counts', params) \
+            .order('tanggal').range(len(rows), len(rows) + FETCH_PAGE_SIZE - 1).execute()
+        rows.extend(response.data or [])
+        if len(response.data or []) < FETCH_PAGE_SIZE:
+            break
+    return pd.DataFrame(rows, columns=['tanggal', 'row_count'])
+
+def load_table_range(table_name, start_date, end_date, columns, filters=None, version=None):
+    """Load an inclusive date range, through the local partition cache when enabled
+
+    Filtered loads are cached in their own scope so they never mix with full-table partitions.
+    With a recorded data version, cached partitions are only checked for changes after it moves;
+    the check compares updated_at and the rows per day with what each partition was stored with.
+    Raises LookupError if the table does not exist on the server, and the fetch's
+    error if the range could not be read completely.
+    """
+    if not LOCAL_CACHE_ENABLED:
+        # Strict, so a failed fetch raises instead of reaching the block cache as no rows
+        return get_data_in_batches(table_name, start_date, end_date, columns, strict=True, filters=filters)
+    
+    return get_partitioned_data(
+        table_name, start_date, end_date, columns,
+        fetch=lambda start, end, fetch_columns: get_data_in_batches(
+            table_name, start, end, fetch_columns, strict=True, filters=filters
+        ),
+        fetch_changes=lambda start, end, since: get_changed_rows(table_name, start, end, since, filters),
+        fetch_counts=lambda start, end: get_day_counts(table_name, start, end, filters),
+        scope=_filter_scope(filters),
+        version=version
+    )
+
+def run_concurrently(*tasks, max_workers=None):
+    """Run zero-argument callables in parallel threads and return their results in order
+
+    The Streamlit script context is attached to each worker thread, so cached
+    functions called from the tasks behave as they do on the main thread.
+
+    Args:
+        max_workers (int): Thread limit, defaults to one thread per task
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    
+    def run(task):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return task()
+    
+    workers = max(1, min(max_workers or len(tasks), len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, tasks))
+
+def resolve_source_table(table_name, columns, aggregate=USE_AGGREGATE_VIEWS):
+    """Return the daily aggregate view for table_name if it can serve all columns"""
+    if not aggregate or table_name not in AGGREGATE_VIEWS:
+        return table_name
+    view_name = AGGREGATE_VIEWS[table_name]
+    if view_name in _missing_tables:
+        return table_name
     try:
-        # Round dates to reduce cache variations
-        start = pd.Timestamp(start_date).floor(granularity)
-        end = pd.Timestamp(end_date).ceil(granularity)
-        
-        print(f"Fetching cached data for {table_name} from {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}")
-        
-        # Get data in batches
-        df = get_data_in_batches(table_name, start, end, columns)
-        
-        # Convert tanggal to datetime if data exists
-        if not df.empty and 'tanggal' in df.columns:
-            df['tanggal'] = pd.to_datetime(df['tanggal'])
-            
+        view_columns = get_table_columns(view_name)
+    except LookupError:
+        _missing_tables.add(view_name)
+        return table_name
+    if not view_columns or not all(col in view_columns for col in columns):
+        return table_name
+    return view_name
+
+def reads_daily_totals(table_name, columns, aggregate=USE_AGGREGATE_VIEWS):
+    """True if get_cached_data serves table_name from its daily aggregate view
+
+    The view's rows are already one per day and dimension combination, so
+    build_cube would not combine any of them.
+    """
+    return resolve_source_table(table_name, columns, aggregate) != table_name
+
+def _range_blocks(start, end, granularity):
+    """Split an inclusive range into calendar-aligned (block_start, block_end) blocks"""
+    return [
+        (period.start_time.normalize(), period.end_time.normalize())
+        for period in pd.period_range(start, end, freq=granularity)
+    ]
+
+def source_version(table_name):
+    """Data version covering a table and its aggregate view, for cache keys"""
+    view_name = AGGREGATE_VIEWS.get(table_name)
+    if view_name is None or view_name in _missing_tables:
+        return data_version(table_name)
+    return data_version(table_name, view_name)
+
+@cache_frames(ttl=VERSIONED_CACHE_TTL, shared=True)
+def _get_cached_block(table_name, block_start, block_end, columns, aggregate, branches, products, version):
+    """Load one aligned block; cached per (table, columns, block, filters, data version) across sessions"""
+    filters = _value_filters(branches, products)
+    source_table = resolve_source_table(table_name, columns, aggregate)
+    print(f"Fetching block of {table_name} from {source_table} between {block_start.strftime('%Y-%m-%d')} and {block_end.strftime('%Y-%m-%d')}")
+    
+    try:
+        df = load_table_range(source_table, block_start, block_end, columns, filters,
+                              recorded_version(source_table))
+    except LookupError:
+        # Fall back to raw rows if the aggregate view has not been created yet
+        print(f"Aggregate view {source_table} not available, reading {table_name}")
+        df = load_table_range(table_name, block_start, block_end, columns, filters,
+                              recorded_version(table_name))
+    return apply_fact_schema(df)
+
+def get_cached_data(table_name, start_date, end_date, columns, granularity='M', aggregate=USE_AGGREGATE_VIEWS,
+                    branches=None, products=None):
+    """Get cached data, assembled from calendar blocks cached independently
+
+    Overlapping ranges share every block they have in common, so only blocks no
+    session has loaded yet are fetched. A table missing on the server gives no
+    rows; other errors are raised, so no caller caches a failed or partial load.
+
+    Args:
+        granularity (str): Block size as a pandas period frequency, 'M' (month) or 'D' (day)
+        aggregate (bool): Read the table's daily aggregate view when it has all columns
+        branches, products (tuple): Only return rows for these kode_cabang/kode_produk
+            values (None = all). Pass them through normalize_filter for stable cache keys.
+    """
+    if branches == () or products == ():
+        # Nothing selected, so there is nothing to fetch
+        return pd.DataFrame()
+    
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    blocks = _range_blocks(start, end, granularity)
+    print(f"Assembling {table_name} between {start.strftime('%Y-%m-%d')} and {end.strftime('%Y-%m-%d')} from {len(blocks)} blocks")
+    
+    # Cached blocks return immediately, missing ones are fetched side by side.
+    # Blocks are keyed on the data version, so a sync replaces them all at once
+    version = source_version(table_name)
+    try:
+        frames = run_concurrently(*[
+            lambda block=block: _get_cached_block(table_name, block[0], block[1], list(columns),
+                                                  aggregate, branches, products, version)
+            for block in blocks
+        ], max_workers=FETCH_MAX_WORKERS)
+    except LookupError as e:
+        print(f"No data for {table_name}: {str(e)}")
+        return pd.DataFrame()
+    df = concat_fact_frames(frames)
+    if df.empty:
         return df
-    except Exception as e:
-        print(f"Error in get_cached_data for {table_name}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return pd.DataFrame() 
\ No newline at end of file
+    
+    # Blocks overhang the range at both ends
+    df = df[(df['tanggal'] >= start) & (df['tanggal'] <= end)].reset_index(drop=True)
+    # The blocks are typed already; this only reports the memory used
+    return apply_fact_schema(df, label=table_name)
@@ -0,0 +1,45 @@
+import time
+import streamlit as st
+from src.backend.supabase_client import get_supabase_client, get_env_var
+
+# How often the data_versions table is read; this bounds staleness after a sync
+DATA_VERSION_CHECK_SECONDS = int(get_env_var("DATA_VERSION_CHECK_SECONDS", 30))
+# Lifetime of cache entries keyed on a data version. They only need to expire to free memory
+VERSIONED_CACHE_TTL = int(get_env_var("VERSIONED_CACHE_TTL", 86400))
+# Expiry used instead when a table has no recorded version (e.g. data_versions not set up)
+DATA_CACHE_TTL = int(get_env_var("DATA_CACHE_TTL", 300))
+MAPPING_CACHE_TTL = 3600
+
+@st.cache_data(ttl=DATA_VERSION_CHECK_SECONDS, show_spinner=False)
+def get_data_versions():
+    """Get {table_name: version} from the data_versions table in one query
+
+    Versions are bumped by triggers whenever a table is written (see supabase_setup.sql).
+    Returns an empty dict if the table cannot be read.
+    """
+    try:
+        supabase = get_supabase_client(use_service_role=True)
+        response = supabase.table('data_versions').select('table_name, version').execute()
+        return {row['table_name']: row['version'] for row in response.data or []}
+    except Exception as e:
+        print(f"Could not read data versions, falling back to time-based expiry: {str(e)}")
+        return {}
+
+def recorded_version(*table_names):
+    """Get the tables' versions as a tuple, or None if one of them has no recorded version"""
+    versions = get_data_versions()
+    if all(name in versions for name in table_names):
+        return tuple(versions[name] for name in table_names)
+    return None
+
+def data_version(*table_names, fallback_ttl=DATA_CACHE_TTL):
+    """Get a cache key part that changes whenever one of the tables changes
+
+    Pass the result to a cached function so its entries are replaced right
+    after a sync and kept otherwise. If a table has no recorded version the
+    key changes every fallback_ttl seconds instead, like a plain TTL.
+    """
+    version = recorded_version(*table_names)
+    if version is not None:
+        return version
+    return ('expires', int(time.time() // fallback_ttl))
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import pandas as pd
+from src.backend.supabase_client import get_env_var
+from src.backend.arrow_snapshots import shared_snapshot
+
+# Memory budget for cached fact frames across all sessions of the process
+FRAME_CACHE_MAX_MB = int(get_env_var("FRAME_CACHE_MAX_MB", 1024))
+
+def frame_size(value):
+    """Bytes held by a DataFrame, or by the DataFrames inside a tuple/list"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(frame_size(item) for item in value)
+    return 0
+
+def _shallow_copy(value):
+    """Copy frames without their data, so callers can add or replace columns safely"""
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_shallow_copy(item) for item in value)
+    if isinstance(value, list):
+        return [_shallow_copy(item) for item in value]
+    return value
+
+def _freeze(value):
+    """Turn lists in arguments into tuples so they can be part of a key"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+class FrameCache:
+    """Process-wide LRU cache for DataFrames, bounded by their real memory size
+
+    Unlike st.cache_data, values are kept as live objects instead of pickles
+    and are evicted least-recently-used first once the byte budget is exceeded.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key):
+        """Return (True, value) for a live entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, _, expires_at = entry
+            if expires_at is not None and time.monotonic() > expires_at:
+                self._pop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, _shallow_copy(value)
+
+    def put(self, key, value, ttl=None):
+        size = frame_size(value)
+        if size > self.max_bytes:
+            print(f"Not caching a {size / (1024 * 1024):.1f} MB result, larger than the cache budget")
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            evicted = 0
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            print(f"Evicted {evicted} cached frames, now using "
+                  f"{self.current_bytes / (1024 * 1024):.1f} of {self.max_bytes / (1024 * 1024):.1f} MB")
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for key, computing it once even under concurrent callers
+
+        If compute raises, nothing is cached and the next caller tries again.
+        """
+        found, value = self.get(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have filled it while we waited
+            found, value = self.get(key)
+            if found:
+                return value
+            value = compute()
+            self.put(key, value, ttl)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return _shallow_copy(value)
+
+    def clear(self, name=None):
+        """Drop all entries, or only those of the cached function called name"""
+        with self._lock:
+            for key in [key for key in self._entries if name is None or key[0] == name]:
+                self._pop(key)
+
+    def stats(self):
+        """Current usage and counters, e.g. for logging or an admin view"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'used_mb': round(self.current_bytes / (1024 * 1024), 1),
+                'budget_mb': round(self.max_bytes / (1024 * 1024), 1),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+frame_cache = FrameCache(FRAME_CACHE_MAX_MB * 1024 * 1024)
+
+def cache_frames(ttl=None, shared=False):
+    """Decorator caching a function's DataFrame results in the shared FrameCache
+
+    Used like st.cache_data; the decorated function gets a .clear() method.
+    Exceptions pass through uncached, so loaders signal a failed load by raising;
+    empty frames are valid results and cached like any other.
+
+    Args:
+        shared (bool): Also keep results as memory-mapped Arrow snapshots, so other
+            server processes reuse them instead of loading their own copy
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+            compute = lambda: func(*args, **kwargs)
+            if shared:
+                compute = lambda: shared_snapshot(key, lambda: func(*args, **kwargs), ttl)
+            return frame_cache.get_or_compute(key, compute, ttl)
+
+        wrapper.clear = lambda: frame_cache.clear(name)
+        return wrapper
+    return decorator
@@ -0,0 +1,240 @@
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from src.backend.supabase_client import get_env_var
+from src.backend.arrow_snapshots import snapshot_source
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Engine for the tabs' aggregations: 'pandas' (default) or 'duckdb', which runs them
+# as SQL scans of the Arrow snapshot files with the date, branch and product predicates
+# pushed down, and only materializes the small results.
+# Needs `pip install duckdb`; without it the pandas implementation is used
+QUERY_ENGINE = get_env_var("QUERY_ENGINE", "pandas").lower()
+
+if QUERY_ENGINE == 'duckdb' and duckdb is None:
+    print("QUERY_ENGINE=duckdb but duckdb is not installed, aggregating with pandas")
+
+_connection = None
+_connection_lock = threading.Lock()
+
+def _use_duckdb():
+    return QUERY_ENGINE == 'duckdb' and duckdb is not None
+
+def _cursor():
+    """A cursor on the process-wide in-memory database; cursors can be used from any thread"""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = duckdb.connect()
+        return _connection.cursor()
+
+class FactSelection:
+    """Rows of a fact frame between two dates (inclusive) for some branches and products
+
+    Nothing is copied out of the frame when the selection is made; the
+    aggregations below compute from it. The DuckDB engine applies the
+    selection in its scan, of the snapshot file the frame maps if there is
+    one, and only returns the aggregates. The pandas engine filters the rows
+    once, on first use.
+    """
+
+    def __init__(self, df, start_date, end_date, branches, products):
+        self.df = df
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        self.branches = list(branches)
+        self.products = list(products)
+        self._rows = None
+        self._empty = None
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    @property
+    def empty(self):
+        if self._empty is None:
+            if _use_duckdb() and not self.df.empty:
+                self._empty = not _query(self, 'SELECT EXISTS (SELECT 1 FROM facts) AS found', [])['found'].iloc[0]
+            else:
+                self._empty = self.rows().empty
+        return self._empty
+
+    def rows(self):
+        """The selected rows as a DataFrame"""
+        if self._rows is None:
+            df = self.df
+            self._rows = df[(df['Tanggal'] >= self.start_date) & (df['Tanggal'] <= self.end_date) &
+                            df['KodeCabang'].isin(self.branches) & df['KodeProduk'].isin(self.products)]
+        return self._rows
+
+    def condition(self):
+        """SQL condition and parameters selecting these rows"""
+        conditions = ['"Tanggal" BETWEEN ? AND ?']
+        params = [self.start_date, self.end_date]
+        for column, values in (('KodeCabang', self.branches), ('KodeProduk', self.products)):
+            conditions.append(f'"{column}" IN ({", ".join("?" * len(values))})' if values else 'FALSE')
+            params += [str(value) for value in values]
+        return ' AND '.join(conditions), params
+
+def select_facts(df, start_date, end_date, branches, products):
+    """Select the rows of df between the dates (inclusive) for the branches and products
+
+    Returns:
+        FactSelection: To pass to the aggregations below
+    """
+    return FactSelection(df, start_date, end_date, branches, products)
+
+def _rows(source):
+    return source.rows() if isinstance(source, FactSelection) else source
+
+def _open_snapshot(df):
+    """Dataset of the snapshot file df maps, or None"""
+    path = snapshot_source(df)
+    if path is None:
+        return None
+    try:
+        return ds.dataset(path, format='arrow')
+    except FileNotFoundError:
+        # Pruned since it was mapped; the frame still holds the rows
+        return None
+
+def _query(source, sql, params):
+    """Run sql with the rows of source, a DataFrame or FactSelection, available as the table facts
+
+    A selection is applied in the scan: of the snapshot file its frame maps,
+    so only the columns and rows the query needs are read, or of the frame
+    itself. DataFrames are queried as they are.
+    """
+    cursor = _cursor()
+    try:
+        if isinstance(source, FactSelection):
+            dataset = _open_snapshot(source.df)
+            cursor.register('source', source.df if dataset is None else dataset)
+            condition, scan_params = source.condition()
+            sql = f"WITH facts AS (SELECT * FROM source WHERE {condition}) {sql}"
+            params = scan_params + params
+        else:
+            cursor.register('facts', source)
+        return cursor.execute(sql, params).df()
+    finally:
+        cursor.close()
+
+def _where(filters, latest_only):
+    """WHERE clause and parameters for equality filters, optionally on the latest date only"""
+    conditions = [f'"{column}" = ?' for column in filters]
+    params = list(filters.values())
+    if latest_only:
+        latest_conditions = ' AND '.join(conditions) or 'TRUE'
+        conditions.append(f'"Tanggal" = (SELECT MAX("Tanggal") FROM facts WHERE {latest_conditions})')
+        params += params
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+def _filter_frame(df, filters, latest_only):
+    for column, value in filters.items():
+        df = df[df[column] == value]
+    if latest_only and not df.empty:
+        df = df[df['Tanggal'] == df['Tanggal'].max()]
+    return df
+
+def group_totals(source, keys, value, filters=None, latest_only=False, top_first=False):
+    """Sum value per combination of keys
+
+    Args:
+        source: DataFrame or FactSelection
+        keys (list): Columns to group by; rows with a missing key are left out
+        filters (dict): Only rows whose column equals the value, e.g. {'KodeCabang': '01'}
+        latest_only (bool): Only rows of the latest Tanggal left after filtering
+        top_first (bool): Order by the total, largest first, instead of by keys
+
+    Returns:
+        pd.DataFrame: One row per group with the keys and the summed value
+    """
+    filters = filters or {}
+    if source.empty:
+        return pd.DataFrame(columns=list(keys) + [value])
+    if _use_duckdb():
+        where, params = _where(filters, latest_only)
+        key_list = ', '.join(f'"{key}"' for key in keys)
+        not_null = ' AND '.join(f'"{key}" IS NOT NULL' for key in keys)
+        where = f"{where} AND {not_null}" if where else f"WHERE {not_null}"
+        order = f'"{value}" DESC' if top_first else key_list
+        return _query(source, f'SELECT {key_list}, SUM("{value}") AS "{value}" FROM facts {where} '
+                              f'GROUP BY {key_list} ORDER BY {order}', params)
+
+    df = _filter_frame(_rows(source), filters, latest_only)
+    totals = df.groupby(list(keys), observed=True)[value].sum().reset_index()
+    if top_first:
+        totals = totals.sort_values(value, ascending=False)
+    return totals
+
+def first_last_totals(source, value, filters=None, min_kolektibilitas=None):
+    """Total of value on the first and on the last Tanggal
+
+    Args:
+        min_kolektibilitas (int): Only sum rows with at least this Kolektibilitas,
+            e.g. 3 for non-performing ones; the first and last Tanggal are still
+            those of all rows
+
+    Returns:
+        tuple: (first, last), (0, 0) without rows
+    """
+    filters = filters or {}
+    if source.empty:
+        return 0, 0
+    if _use_duckdb():
+        where, params = _where(filters, False)
+        summed = f'"{value}"'
+        if min_kolektibilitas is not None:
+            summed = f'CASE WHEN "Kolektibilitas" >= ? THEN "{value}" ELSE 0 END'
+            params = [min_kolektibilitas] + params
+        result = _query(source, f'SELECT arg_min(total, "Tanggal") AS first, arg_max(total, "Tanggal") AS last '
+                                f'FROM (SELECT "Tanggal", SUM({summed}) AS total FROM facts {where} '
+                                f'GROUP BY "Tanggal") AS daily',
+                        params)
+        first, last = result.iloc[0]
+        return (0, 0) if pd.isna(first) else (first, last)
+
+    df = _filter_frame(_rows(source), filters, False)
+    if df.empty:
+        return 0, 0
+    values = df[value]
+    if min_kolektibilitas is not None:
+        values = values.where(df['Kolektibilitas'] >= min_kolektibilitas, 0)
+    daily = values.groupby(df['Tanggal']).sum()
+    return daily.iloc[0], daily.iloc[-1]
+
+def period_totals(source, value, freq):
+    """Sum value per period of Tanggal, like grouping the rows by pd.Grouper(key='Tanggal', freq=freq)
+
+    Only daily totals are computed from the rows; they are summed into periods
+    here, with 0 for periods without rows between the first and the last.
+
+    Returns:
+        pd.DataFrame: Tanggal (the period label) and the summed value
+    """
+    daily = group_totals(source, ['Tanggal'], value)
+    daily = daily.astype({'Tanggal': 'datetime64[ns]', value: np.float64})
+    return daily.groupby(pd.Grouper(key='Tanggal', freq=freq))[value].sum().reset_index()
+
+def has_values(source, column):
+    """True if any row of source has column set"""
+    if source.empty or column not in source.columns:
+        return False
+    if _use_duckdb():
+        return bool(_query(source, f'SELECT EXISTS (SELECT 1 FROM facts WHERE "{column}" IS NOT NULL) AS found',
+                           [])['found'].iloc[0])
+    return bool(_rows(source)[column].notna().any())
+
+def pivot_totals(source, value, index, columns):
+    """Sum value into an index x columns table, 0 where a combination has no rows"""
+    totals = group_totals(source, [index, columns], value)
+    if totals.empty:
+        return pd.DataFrame(dtype=np.float64)
+    pivot = totals.pivot(index=index, columns=columns, values=value).fillna(0)
+    return pivot.sort_index().sort_index(axis=1)
@@ -719,4 +719,337 @@ UNION ALL
 SELECT * FROM pembiayaan_data_summary
 UNION ALL
 SELECT * FROM rahn_data_summary
-ORDER BY table_name, period; 
\ No newline at end of file
+ORDER BY table_name, period; 
+-- ============================================================================
+-- DAILY AGGREGATE VIEWS
+-- ============================================================================
+-- Pre-aggregated daily totals used by the dashboard instead of raw rows.
+-- Column names match the base tables so the loaders can read either source.
+-- updated_at carries the newest base row of each group for incremental refresh.
+-- Refresh after every sync with: SELECT refresh_daily_summaries();
+
+-- Daily deposito totals per branch and product
+CREATE MATERIALIZED VIEW IF NOT EXISTS deposito_data_daily AS
+SELECT
+    tanggal,
+    kode_cabang,
+    kode_produk,
+    SUM(nominal) AS nominal,
+    COUNT(*) AS row_count,
+    MAX(updated_at) AS updated_at
+FROM deposito_data
+GROUP BY tanggal, kode_cabang, kode_produk;
+
+-- Daily tabungan totals per branch and product
+CREATE MATERIALIZED VIEW IF NOT EXISTS tabungan_data_daily AS
+SELECT
+    tanggal,
+    kode_cabang,
+    kode_produk,
+    SUM(nominal) AS nominal,
+    COUNT(*) AS row_count,
+    MAX(updated_at) AS updated_at
+FROM tabungan_data
+GROUP BY tanggal, kode_cabang, kode_produk;
+
+-- Daily pembiayaan totals per branch, product, kolektibilitas, group and collector
+CREATE MATERIALIZED VIEW IF NOT EXISTS pembiayaan_data_daily AS
+SELECT
+    tanggal,
+    kode_cabang,
+    kode_produk,
+    kolektibilitas,
+    kode_grup1,
+    kode_grup2,
+    kd_kolektor,
+    SUM(jml_pencairan) AS jml_pencairan,
+    SUM(byr_pokok) AS byr_pokok,
+    SUM(outstanding) AS outstanding,
+    COUNT(*) AS row_count,
+    MAX(updated_at) AS updated_at
+FROM pembiayaan_data
+GROUP BY tanggal, kode_cabang, kode_produk, kolektibilitas, kode_grup1, kode_grup2, kd_kolektor;
+
+-- Daily rahn totals per branch, product and kolektibilitas
+CREATE MATERIALIZED VIEW IF NOT EXISTS rahn_data_daily AS
+SELECT
+    tanggal,
+    kode_cabang,
+    kode_produk,
+    kolektibilitas,
+    SUM(nominal) AS nominal,
+    COUNT(*) AS row_count,
+    MAX(updated_at) AS updated_at
+FROM rahn_data
+GROUP BY tanggal, kode_cabang, kode_produk, kolektibilitas;
+
+-- Unique indexes are required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_deposito_data_daily_key
+ON deposito_data_daily(tanggal, kode_cabang, kode_produk) NULLS NOT DISTINCT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tabungan_data_daily_key
+ON tabungan_data_daily(tanggal, kode_cabang, kode_produk) NULLS NOT DISTINCT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pembiayaan_data_daily_key
+ON pembiayaan_data_daily(tanggal, kode_cabang, kode_produk, kolektibilitas, kode_grup1, kode_grup2, kd_kolektor) NULLS NOT DISTINCT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rahn_data_daily_key
+ON rahn_data_daily(tanggal, kode_cabang, kode_produk, kolektibilitas) NULLS NOT DISTINCT;
+
+-- Materialized views are not covered by RLS, so only the service role may read them
+REVOKE ALL ON deposito_data_daily, tabungan_data_daily, pembiayaan_data_daily, rahn_data_daily FROM anon, authenticated;
+GRANT SELECT ON deposito_data_daily, tabungan_data_daily, pembiayaan_data_daily, rahn_data_daily TO service_role;
+
+-- Function to refresh all daily aggregate views and bump their data versions
+-- (bump_data_version is defined in the DATA VERSIONS section below)
+CREATE OR REPLACE FUNCTION refresh_daily_summaries() RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY deposito_data_daily;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY tabungan_data_daily;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY pembiayaan_data_daily;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY rahn_data_daily;
+    PERFORM bump_data_version('deposito_data_daily');
+    PERFORM bump_data_version('tabungan_data_daily');
+    PERFORM bump_data_version('pembiayaan_data_daily');
+    PERFORM bump_data_version('rahn_data_daily');
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- ============================================================================
+-- DATA VERSIONS
+-- ============================================================================
+-- One row per table, bumped on every write so the dashboard can tell which
+-- caches a sync invalidated with a single cheap query.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Only the service role (which bypasses RLS) reads or writes versions
+ALTER TABLE data_versions ENABLE ROW LEVEL SECURITY;
+
+-- Function to bump the version of a table or view
+CREATE OR REPLACE FUNCTION bump_data_version(p_table_name TEXT) RETURNS void AS $$
+BEGIN
+    INSERT INTO data_versions (table_name, version, updated_at)
+    VALUES (p_table_name, 1, NOW())
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = data_versions.version + 1,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Statement-level trigger so a bulk sync bumps the version once per statement
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_data_version(TG_TABLE_NAME::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'deposito_data', 'tabungan_data', 'pembiayaan_data', 'rahn_data',
+        'branch_mapping', 'deposito_product_mapping', 'tabungan_product_mapping',
+        'pembiayaan_product_mapping', 'rahn_product_mapping', 'grup1_mapping', 'grup2_mapping'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS bump_%s_version ON %I', t, t);
+        EXECUTE format(
+            'CREATE TRIGGER bump_%s_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t, t
+        );
+    END LOOP;
+END;
+$$;
+
+-- ============================================================================
+-- MAPPING LOOKUP
+-- ============================================================================
+-- Returns every dimension table as one JSON object so the dashboard loads all
+-- code -> name mappings in a single round-trip.
+CREATE OR REPLACE FUNCTION get_mappings() RETURNS JSON AS $$
+    SELECT json_build_object(
+        'branch_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_cabang', kode_cabang, 'nama_cabang', nama_cabang)), '[]'::json) FROM branch_mapping),
+        'deposito_product_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_produk', kode_produk, 'nama_produk', nama_produk)), '[]'::json) FROM deposito_product_mapping),
+        'tabungan_product_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_produk', kode_produk, 'nama_produk', nama_produk)), '[]'::json) FROM tabungan_product_mapping),
+        'pembiayaan_product_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_produk', kode_produk, 'nama_produk', nama_produk)), '[]'::json) FROM pembiayaan_product_mapping),
+        'rahn_product_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_produk', kode_produk, 'nama_produk', nama_produk)), '[]'::json) FROM rahn_product_mapping),
+        'grup1_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_grup1', kode_grup1, 'nama_grup', nama_grup)), '[]'::json) FROM grup1_mapping),
+        'grup2_mapping', (SELECT COALESCE(json_agg(json_build_object('kode_grup2', kode_grup2, 'nama_grup', nama_grup)), '[]'::json) FROM grup2_mapping)
+    );
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+REVOKE ALL ON FUNCTION get_mappings() FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_mappings() TO service_role;
+
+-- ============================================================================
+-- CACHE CHECKS
+-- ============================================================================
+-- Rows per day of a fact table or daily view, optionally only for some branches
+-- and products. The dashboard compares them with its cached day partitions to
+-- find days that lost rows, since deletes leave no newer updated_at behind.
+CREATE OR REPLACE FUNCTION cache_day_counts(
+    p_table_name TEXT,
+    p_start DATE,
+    p_end DATE,
+    p_branches TEXT[] DEFAULT NULL,
+    p_products TEXT[] DEFAULT NULL
+) RETURNS TABLE (tanggal DATE, row_count BIGINT) AS $$
+BEGIN
+    IF p_table_name NOT IN ('deposito_data', 'tabungan_data', 'pembiayaan_data', 'rahn_data',
+                            'deposito_data_daily', 'tabungan_data_daily',
+                            'pembiayaan_data_daily', 'rahn_data_daily') THEN
+        RAISE EXCEPTION 'Table % has no day counts', p_table_name;
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT t.tanggal, COUNT(*) FROM %I t WHERE t.tanggal BETWEEN $1 AND $2 '
+        'AND ($3 IS NULL OR t.kode_cabang = ANY($3)) AND ($4 IS NULL OR t.kode_produk = ANY($4)) '
+        'GROUP BY t.tanggal',
+        p_table_name
+    ) USING p_start, p_end, p_branches, p_products;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+REVOKE ALL ON FUNCTION cache_day_counts(TEXT, DATE, DATE, TEXT[], TEXT[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION cache_day_counts(TEXT, DATE, DATE, TEXT[], TEXT[]) TO service_role;
+
+-- ============================================================================
+-- SYNC
+-- ============================================================================
+-- Rows of a day too large for one call, staged by sync_stage_rows until
+-- sync_replace_rows swaps the whole day in. Left-over batches of an
+-- interrupted sync are removed by later calls.
+CREATE TABLE IF NOT EXISTS sync_staging (
+    batch_id TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    tanggal DATE NOT NULL,
+    rows JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_staging_batch ON sync_staging(batch_id);
+
+-- Only the service role (which bypasses RLS) stages rows
+ALTER TABLE sync_staging ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION sync_stage_rows(
+    p_batch_id TEXT,
+    p_table_name TEXT,
+    p_tanggal DATE,
+    p_rows JSONB
+) RETURNS void AS $$
+BEGIN
+    INSERT INTO sync_staging (batch_id, table_name, tanggal, rows)
+    VALUES (p_batch_id, p_table_name, p_tanggal, p_rows);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+REVOKE ALL ON FUNCTION sync_stage_rows(TEXT, TEXT, DATE, JSONB) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION sync_stage_rows(TEXT, TEXT, DATE, JSONB) TO service_role;
+
+-- Replaces one day of a fact table (or only the branches in p_branches) with
+-- p_rows plus the rows staged under p_batch_id, in a single transaction, so
+-- the dashboard never sees a half-written day. Used by src/backend/sync_worker.py.
+DROP FUNCTION IF EXISTS sync_replace_rows(TEXT, DATE, JSONB, BOOLEAN);
+DROP FUNCTION IF EXISTS sync_replace_rows(TEXT, DATE, JSONB, BOOLEAN, TEXT[]);
+CREATE OR REPLACE FUNCTION sync_replace_rows(
+    p_table_name TEXT,
+    p_tanggal DATE,
+    p_rows JSONB,
+    p_branches TEXT[] DEFAULT NULL,
+    p_batch_id TEXT DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    column_list TEXT;
+    first_row JSONB;
+    inserted INTEGER := 0;
+    staged INTEGER := 0;
+BEGIN
+    IF p_table_name NOT IN ('deposito_data', 'tabungan_data', 'pembiayaan_data', 'rahn_data') THEN
+        RAISE EXCEPTION 'Table % cannot be synced', p_table_name;
+    END IF;
+
+    EXECUTE format('DELETE FROM %I WHERE tanggal = $1 AND ($2 IS NULL OR kode_cabang = ANY($2))',
+                   p_table_name) USING p_tanggal, p_branches;
+
+    -- Only the keys sent are inserted, so created_at/updated_at keep their defaults
+    first_row := COALESCE(
+        p_rows -> 0,
+        (SELECT s.rows -> 0 FROM sync_staging s WHERE s.batch_id = p_batch_id LIMIT 1)
+    );
+    IF first_row IS NOT NULL THEN
+        SELECT string_agg(quote_ident(key), ', ') INTO column_list
+        FROM jsonb_object_keys(first_row) AS key;
+        EXECUTE format('INSERT INTO %I (%s) SELECT %s FROM jsonb_populate_recordset(NULL::%I, $1)',
+                       p_table_name, column_list, column_list, p_table_name)
+        USING p_rows;
+        GET DIAGNOSTICS inserted = ROW_COUNT;
+    END IF;
+
+    IF p_batch_id IS NOT NULL AND column_list IS NOT NULL THEN
+        EXECUTE format('INSERT INTO %I (%s) SELECT r.%s FROM sync_staging s, '
+                       'jsonb_populate_recordset(NULL::%I, s.rows) r '
+                       'WHERE s.batch_id = $1 AND s.table_name = $2 AND s.tanggal = $3',
+                       p_table_name, column_list, replace(column_list, ', ', ', r.'), p_table_name)
+        USING p_batch_id, p_table_name, p_tanggal;
+        GET DIAGNOSTICS staged = ROW_COUNT;
+    END IF;
+    DELETE FROM sync_staging WHERE batch_id = p_batch_id;
+
+    -- Batches of syncs that died before their swap
+    DELETE FROM sync_staging WHERE created_at < NOW() - INTERVAL '1 day';
+    RETURN inserted + staged;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+REVOKE ALL ON FUNCTION sync_replace_rows(TEXT, DATE, JSONB, TEXT[], TEXT) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION sync_replace_rows(TEXT, DATE, JSONB, TEXT[], TEXT) TO service_role;
+
+-- Row count and checksum per (tanggal, kode_cabang), compared by the sync worker
+-- with the same fingerprint of the source rows so only changed partitions are
+-- re-sent. The checksum adds up the first 60 bits of each row's MD5 over every
+-- synced column, and must stay in line with _row_texts in sync_worker.py:
+-- columns in SYNC_TABLES order joined by '|', dates as YYYY-MM-DD, amounts with
+-- two decimals, levels as integers and '' for NULL. The sums outgrow BIGINT, so
+-- they are returned as TEXT.
+DROP FUNCTION IF EXISTS sync_fingerprints(TEXT, DATE, DATE);
+CREATE OR REPLACE FUNCTION sync_fingerprints(p_table_name TEXT, p_start DATE, p_end DATE)
+RETURNS TABLE (tanggal DATE, kode_cabang VARCHAR, row_count BIGINT, checksum TEXT) AS $$
+DECLARE
+    row_text TEXT;
+BEGIN
+    row_text := CASE p_table_name
+        WHEN 'deposito_data' THEN
+            'to_char(t.tanggal, ''YYYY-MM-DD''), COALESCE(t.kode_cabang, ''''), COALESCE(t.kode_produk, ''''), '
+            'COALESCE(ROUND(t.nominal, 2)::TEXT, '''')'
+        WHEN 'tabungan_data' THEN
+            'to_char(t.tanggal, ''YYYY-MM-DD''), COALESCE(t.kode_cabang, ''''), COALESCE(t.kode_produk, ''''), '
+            'COALESCE(ROUND(t.nominal, 2)::TEXT, '''')'
+        WHEN 'rahn_data' THEN
+            'to_char(t.tanggal, ''YYYY-MM-DD''), COALESCE(t.kode_cabang, ''''), COALESCE(t.kode_produk, ''''), '
+            'COALESCE(ROUND(t.nominal, 2)::TEXT, ''''), COALESCE(NULLIF(t.kolektibilitas, 0)::TEXT, '''')'
+        WHEN 'pembiayaan_data' THEN
+            'to_char(t.tanggal, ''YYYY-MM-DD''), COALESCE(t.kode_cabang, ''''), COALESCE(t.kode_produk, ''''), '
+            'COALESCE(NULLIF(t.kolektibilitas, 0)::TEXT, ''''), COALESCE(ROUND(t.jml_pencairan, 2)::TEXT, ''''), '
+            'COALESCE(ROUND(t.byr_pokok, 2)::TEXT, ''''), COALESCE(ROUND(t.outstanding, 2)::TEXT, ''''), '
+            'COALESCE(t.kd_sts_pemb, ''''), COALESCE(t.kode_grup1, ''''), COALESCE(t.kode_grup2, ''''), '
+            'COALESCE(t.kd_kolektor, '''')'
+    END;
+    IF row_text IS NULL THEN
+        RAISE EXCEPTION 'Table % cannot be synced', p_table_name;
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT t.tanggal, t.kode_cabang, COUNT(*), '
+        'SUM((''x'' || substr(md5(concat_ws(''|'', %s)), 1, 15))::BIT(60)::BIGINT)::TEXT '
+        'FROM %I t WHERE t.tanggal BETWEEN $1 AND $2 GROUP BY t.tanggal, t.kode_cabang',
+        row_text, p_table_name
+    ) USING p_start, p_end;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+REVOKE ALL ON FUNCTION sync_fingerprints(TEXT, DATE, DATE) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION sync_fingerprints(TEXT, DATE, DATE) TO service_role;
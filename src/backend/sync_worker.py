@@ -0,0 +1,381 @@
+import argparse
+import hashlib
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+from src.backend.supabase_client import get_env_var, get_admin_client
+from src.backend.check_data_server import get_engine
+from src.backend.database_offline import OFFLINE_SOURCES
+from src.backend.database_utils import (FETCH_PAGE_SIZE, TypedFrameBuilder, _column_kind, concat_fact_frames,
+                                         run_concurrently)
+
+# Minutes between sync runs of run_sync_loop
+SYNC_INTERVAL_MINUTES = int(get_env_var("SYNC_INTERVAL_MINUTES", 60))
+# Rows fetched per fetchmany() from the source, and rows sent per write to the target
+SYNC_FETCH_SIZE = int(get_env_var("SYNC_FETCH_SIZE", 10000))
+SYNC_BATCH_SIZE = int(get_env_var("SYNC_BATCH_SIZE", 5000))
+# Tables extracted and written in parallel
+SYNC_MAX_WORKERS = int(get_env_var("SYNC_MAX_WORKERS", 4))
+# Monthly source tables synced per run: the current month and the ones before it
+SYNC_MONTHS = int(get_env_var("SYNC_MONTHS", 2))
+# SQLAlchemy URLs overriding the SQL Server source (also per table, e.g.
+# SYNC_SOURCE_URL_RAHN_DATA=sqlite:///database/rahn.db) and replacing Supabase as
+# the target, so the pipeline can run against a local SQLite or Postgres stand-in
+SYNC_SOURCE_URL = get_env_var("SYNC_SOURCE_URL")
+SYNC_TARGET_URL = get_env_var("SYNC_TARGET_URL")
+
+# Supabase table -> monthly source table prefix and {Supabase column: source column}.
+# Source tables are named <prefix>YYYYMM, as in the SQLite snapshots
+SYNC_TABLES = {
+    table_name: {'prefix': source['prefix'], 'columns': source['columns']}
+    for table_name, source in OFFLINE_SOURCES.items()
+}
+SYNC_TABLES['pembiayaan_data'] = {
+    'prefix': 'PembiayaanData',
+    'columns': {'tanggal': 'Tanggal', 'kode_cabang': 'KodeCabang', 'kode_produk': 'KodeProduk',
+                'kolektibilitas': 'Kolektibilitas', 'jml_pencairan': 'JmlPencairan',
+                'byr_pokok': 'ByrPokok', 'outstanding': 'Outstanding', 'kd_sts_pemb': 'KdStsPemb',
+                'kode_grup1': 'KodeGrup1', 'kode_grup2': 'KodeGrup2', 'kd_kolektor': 'KdKolektor'},
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _url_engine(url):
+    with _engines_lock:
+        if url not in _engines:
+            _engines[url] = create_engine(url)
+        return _engines[url]
+
+def _source_engine(table_name):
+    url = get_env_var(f"SYNC_SOURCE_URL_{table_name.upper()}") or SYNC_SOURCE_URL
+    return _url_engine(url) if url else get_engine()
+
+def _default_since():
+    """First month (YYYYMM) of the SYNC_MONTHS most recent months"""
+    return (pd.Timestamp.now().to_period('M') - (SYNC_MONTHS - 1)).strftime('%Y%m')
+
+def _source_tables(engine, prefix, since):
+    """The <prefix>YYYYMM tables from month since (YYYYMM) on, oldest first"""
+    pattern = re.compile(rf"^{prefix}(\d{{6}})$")
+    tables = []
+    for name in inspect(engine).get_table_names():
+        match = pattern.match(name)
+        if match and match.group(1) >= since:
+            tables.append(name)
+    return sorted(tables)
+
+def _row_texts(df, columns):
+    """One canonical text per row: the columns' values joined by '|', '' for missing ones
+
+    Dates as YYYY-MM-DD, amounts with two decimals and levels as integers, i.e.
+    the values as stored in the target. Must stay in line with sync_fingerprints
+    in supabase_setup.sql.
+    """
+    parts = []
+    for column in columns:
+        values = df[column]
+        kind = _column_kind(column)
+        present = values.notna()
+        if kind == 'date':
+            text_values = values.dt.strftime('%Y-%m-%d')
+        elif kind == 'amount':
+            # Adding 0.0 turns -0.0 into 0.0, which the target stores as 0.00
+            text_values = (values + 0.0).map('{:.2f}'.format)
+        elif kind == 'level':
+            # The typed schema stores a missing level as 0, the target as NULL
+            present = values > 0
+            text_values = values.astype('int64').astype(str)
+        else:
+            text_values = values.astype(object).astype(str)
+        parts.append(text_values.where(present, ''))
+    return parts[0].str.cat(parts[1:], sep='|')
+
+def fingerprint_frame(df, columns):
+    """Row count and checksum per (tanggal, kode_cabang) of a typed frame
+
+    The checksum adds up the first 60 bits of each row's MD5 over every synced
+    column, so a change to any value of any row changes it, whatever the row order.
+
+    Args:
+        columns (list): Supabase columns to hash, in SYNC_TABLES order
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['tanggal', 'kode_cabang', 'row_count', 'checksum'])
+    hashes = [int(hashlib.md5(text.encode()).hexdigest()[:15], 16) for text in _row_texts(df, columns)]
+    keys = pd.DataFrame({'tanggal': df['tanggal'].dt.normalize(), 'kode_cabang': df['kode_cabang'].astype(str),
+                         'checksum': pd.Series(hashes, index=df.index, dtype=object)})
+    grouped = keys.groupby(['tanggal', 'kode_cabang'], sort=True)
+    return pd.DataFrame({
+        'row_count': grouped.size(),
+        'checksum': grouped['checksum'].agg(lambda checksums: sum(checksums)),
+    }).reset_index()
+
+def _normalize_fingerprints(df):
+    df['tanggal'] = pd.to_datetime(df['tanggal'], format='ISO8601').dt.normalize()
+    df['kode_cabang'] = df['kode_cabang'].astype(str)
+    # Sums of 60-bit hashes outgrow int64, so they are kept as Python ints
+    df['checksum'] = df['checksum'].map(int).astype(object)
+    return df
+
+def _stream_rows(conn, query, params, builder):
+    """Fetch a query's rows into builder, SYNC_FETCH_SIZE rows at a time"""
+    result = conn.execution_options(stream_results=True).execute(query, params)
+    while True:
+        rows = result.fetchmany(SYNC_FETCH_SIZE)
+        if not rows:
+            break
+        builder.append_rows(rows)
+
+def source_fingerprints(engine, source_tables, columns):
+    """Extract the source tables and fingerprint their partitions
+
+    Every source row is read once, one monthly table at a time. The rows are
+    kept, so the changed partitions are sliced from them instead of being read
+    from the source again.
+
+    Returns:
+        tuple: (typed frame of the source rows, fingerprints with tanggal,
+        kode_cabang, row_count and checksum)
+    """
+    df = concat_fact_frames([extract_table(engine, source_table, columns) for source_table in source_tables])
+    if df.empty:
+        return df, pd.DataFrame()
+    # A partition can be spread over two monthly tables (some hold the next month's
+    # first day); fingerprinting the combined rows covers it as one partition
+    return df, _normalize_fingerprints(fingerprint_frame(df, list(columns)))
+
+def target_fingerprints(table_name, start_date, end_date):
+    """Fingerprints of the partitions already in the target between start_date and end_date"""
+    start, end = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+    columns = list(SYNC_TABLES[table_name]['columns'])
+    if SYNC_TARGET_URL:
+        engine = _url_engine(SYNC_TARGET_URL)
+        if not inspect(engine).has_table(table_name):
+            return pd.DataFrame(columns=['tanggal', 'kode_cabang', 'row_count', 'checksum'])
+        query = text(f"SELECT {', '.join(columns)} FROM {table_name} WHERE tanggal >= :start AND tanggal <= :end")
+        builder = TypedFrameBuilder(columns)
+        with engine.connect() as conn:
+            _stream_rows(conn, query, {'start': start, 'end': end}, builder)
+        df = fingerprint_frame(builder.build(), columns)
+    else:
+        client = get_admin_client()
+        rows = []
+        while True:
+            page = (client.rpc('sync_fingerprints', {'p_table_name': table_name, 'p_start': start, 'p_end': end})
+                    .order('tanggal').order('kode_cabang')
+                    .range(len(rows), len(rows) + FETCH_PAGE_SIZE - 1).execute().data)
+            rows.extend(page)
+            if len(page) < FETCH_PAGE_SIZE:
+                break
+        df = pd.DataFrame(rows, columns=['tanggal', 'kode_cabang', 'row_count', 'checksum'])
+    return _normalize_fingerprints(df)
+
+def changed_partitions(source, target):
+    """Compare fingerprints per (tanggal, kode_cabang)
+
+    Returns:
+        tuple: (partitions whose source fingerprint differs from or is missing in
+        the target, partitions only in the target), as sets of (tanggal, kode_cabang)
+    """
+    keys = ['tanggal', 'kode_cabang']
+    source = source.set_index(keys)[['row_count', 'checksum']]
+    # Kept as Python ints, the outer join would turn int64 checksums into rounded floats
+    source['checksum'] = source['checksum'].astype(object)
+    target = target.set_index(keys)[['row_count', 'checksum']]
+    joined = source.join(target, how='outer', lsuffix='_source', rsuffix='_target')
+    differs = ((joined['row_count_source'] != joined['row_count_target'])
+               | (joined['checksum_source'] != joined['checksum_target']))
+    in_source = joined['row_count_source'].notna()
+    return set(joined.index[differs & in_source]), set(joined.index[~in_source])
+
+def extract_table(engine, source_table, columns):
+    """Stream one monthly source table into a typed frame
+
+    Rows are fetched in chunks of SYNC_FETCH_SIZE and split into typed column
+    arrays as they arrive, so only one chunk of row tuples is held at a time.
+
+    Args:
+        columns (dict): Supabase column -> source column
+    """
+    select_list = ", ".join(f"{source_column} AS {column}" for column, source_column in columns.items())
+    builder = TypedFrameBuilder(columns)
+    with engine.connect() as conn:
+        _stream_rows(conn, text(f"SELECT {select_list} FROM {source_table}"), {}, builder)
+    df = builder.build()
+    df['source'] = source_table
+    return df
+
+def _to_records(df):
+    """JSON-ready row dicts: ISO dates, None for missing values and levels"""
+    df = df.assign(tanggal=df['tanggal'].dt.strftime('%Y-%m-%d'))
+    if 'kolektibilitas' in df:
+        # The typed schema stores a missing level as 0
+        df['kolektibilitas'] = df['kolektibilitas'].where(df['kolektibilitas'] > 0)
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+def _by_day(partitions):
+    """{tanggal: sorted branch codes} for a set of (tanggal, kode_cabang)"""
+    days = {}
+    for tanggal, kode_cabang in partitions:
+        days.setdefault(tanggal, []).append(kode_cabang)
+    return {tanggal: sorted(branches) for tanggal, branches in sorted(days.items())}
+
+def _write_supabase(table_name, df, partitions):
+    """Replace the partitions through sync_replace_rows, one call per day
+
+    The fact tables have no unique key to upsert on, so partitions are written
+    whole. A day larger than SYNC_BATCH_SIZE rows is first staged in batches
+    through sync_stage_rows, and the last call deletes the day's rows for the
+    changed branches and inserts the staged ones in one transaction. A sync
+    interrupted while staging leaves the day as it was and is redone by the
+    next run, since its fingerprints still differ. Partitions without rows in
+    df are only deleted.
+    """
+    client = get_admin_client()
+    days = dict(tuple(df.groupby('tanggal'))) if not df.empty else {}
+    for tanggal, branches in _by_day(partitions).items():
+        records = _to_records(days[tanggal]) if tanggal in days else []
+        day = tanggal.strftime('%Y-%m-%d')
+        # Every batch but the last is staged, the last one goes with the swap
+        last_start = max(len(records) - 1, 0) // SYNC_BATCH_SIZE * SYNC_BATCH_SIZE
+        batch_id = uuid.uuid4().hex if last_start else None
+        for start in range(0, last_start, SYNC_BATCH_SIZE):
+            client.rpc('sync_stage_rows', {
+                'p_batch_id': batch_id,
+                'p_table_name': table_name,
+                'p_tanggal': day,
+                'p_rows': records[start:start + SYNC_BATCH_SIZE],
+            }).execute()
+        client.rpc('sync_replace_rows', {
+            'p_table_name': table_name,
+            'p_tanggal': day,
+            'p_rows': records[last_start:],
+            'p_branches': branches,
+            'p_batch_id': batch_id,
+        }).execute()
+
+def _write_sql(table_name, df, partitions):
+    """Replace the partitions in the SQL stand-in target within one transaction"""
+    keys = [{'tanggal': tanggal.strftime('%Y-%m-%d'), 'kode_cabang': kode_cabang}
+            for tanggal, kode_cabang in sorted(partitions)]
+    with _url_engine(SYNC_TARGET_URL).begin() as conn:
+        if inspect(conn).has_table(table_name):
+            conn.execute(text(f"DELETE FROM {table_name} WHERE tanggal = :tanggal AND kode_cabang = :kode_cabang"),
+                         keys)
+        if not df.empty:
+            df.assign(tanggal=df['tanggal'].dt.date).to_sql(
+                table_name, conn, if_exists='append', index=False, chunksize=SYNC_BATCH_SIZE
+            )
+
+def select_partitions(df, partitions):
+    """The rows of df in the given (tanggal, kode_cabang) partitions"""
+    if df.empty or not partitions:
+        return df.iloc[0:0]
+    keys = pd.MultiIndex.from_arrays([df['tanggal'].dt.normalize(), df['kode_cabang'].astype(str)])
+    return df[keys.isin(list(partitions))].reset_index(drop=True)
+
+def sync_table(table_name, since=None, full=False):
+    """Sync the partitions of the monthly source tables from month since (YYYYMM) on
+
+    The source tables are read once. Only (tanggal, kode_cabang) partitions
+    whose row count or checksum differs from the target are written, and
+    partitions gone from the source are deleted, so the writes cost what
+    changed rather than the history.
+
+    Args:
+        full (bool): Rewrite every partition without comparing fingerprints
+
+    Returns:
+        int: Number of partitions replaced or deleted in the target
+    """
+    started = time.monotonic()
+    config = SYNC_TABLES[table_name]
+    engine = _source_engine(table_name)
+    source_tables = _source_tables(engine, config['prefix'], since or _default_since())
+    if not source_tables:
+        print(f"No {config['prefix']} source tables to sync for {table_name}")
+        return 0
+
+    df, fingerprints = source_fingerprints(engine, source_tables, config['columns'])
+    if fingerprints.empty:
+        return 0
+    if full:
+        changed = set(zip(fingerprints['tanggal'], fingerprints['kode_cabang']))
+        removed = set()
+    else:
+        # Up to the end of the last month, so days deleted at its end are found too
+        month_end = pd.Period(source_tables[-1][-6:], 'M').end_time.normalize()
+        target = target_fingerprints(table_name, fingerprints['tanggal'].min(),
+                                     max(fingerprints['tanggal'].max(), month_end))
+        changed, removed = changed_partitions(fingerprints, target)
+    total = len(fingerprints)
+    if not changed and not removed:
+        print(f"{table_name} is up to date ({total} partitions unchanged)")
+        return 0
+
+    # Written together, so a partition spread over two source tables is replaced once
+    df = select_partitions(df, changed)
+    if SYNC_TARGET_URL:
+        _write_sql(table_name, df, changed | removed)
+    else:
+        _write_supabase(table_name, df, changed | removed)
+    print(f"Synced {len(df)} rows in {len(changed)} of {total} partitions into {table_name} "
+          f"({len(removed)} removed) in {time.monotonic() - started:.1f}s")
+    return len(changed) + len(removed)
+
+def sync_all(tables=None, since=None, full=False):
+    """Sync the given tables (all by default) in parallel
+
+    Returns:
+        dict: Table name -> partitions replaced or deleted, or None if its sync failed
+    """
+    started = time.monotonic()
+    tables = list(tables or SYNC_TABLES)
+
+    def run(table_name):
+        try:
+            return sync_table(table_name, since, full)
+        except Exception as e:
+            print(f"Error syncing {table_name}: {str(e)}")
+            return None
+
+    results = dict(zip(tables, run_concurrently(
+        *[lambda table_name=table_name: run(table_name) for table_name in tables],
+        max_workers=SYNC_MAX_WORKERS
+    )))
+    # Also after runs that only deleted partitions: no rows were written, but the views still hold them
+    if not SYNC_TARGET_URL and any(results.values()):
+        try:
+            get_admin_client().rpc('refresh_daily_summaries').execute()
+        except Exception as e:
+            print(f"Error refreshing daily summaries: {str(e)}")
+    print(f"Sync finished in {time.monotonic() - started:.1f}s: {results}")
+    return results
+
+def run_sync_loop(tables=None):
+    """Sync every SYNC_INTERVAL_MINUTES until interrupted"""
+    while True:
+        try:
+            sync_all(tables)
+        except Exception as e:
+            print(f"Error running sync: {str(e)}")
+        time.sleep(SYNC_INTERVAL_MINUTES * 60)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the core banking fact tables into Supabase")
+    parser.add_argument("--once", action="store_true", help="Run one sync instead of the interval loop")
+    parser.add_argument("--since", help="First month to sync (YYYY-MM), implies --once")
+    parser.add_argument("--tables", nargs="+", choices=list(SYNC_TABLES), help="Tables to sync (default all)")
+    parser.add_argument("--full", action="store_true", help="Rewrite all partitions without comparing, implies --once")
+    args = parser.parse_args()
+    if args.once or args.since or args.full:
+        since = datetime.strptime(args.since, '%Y-%m').strftime('%Y%m') if args.since else None
+        sync_all(args.tables, since, args.full)
+    else:
+        run_sync_loop(args.tables)
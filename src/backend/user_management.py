@@ -1,155 +1,216 @@
 import sqlite3
 import hashlib
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Optional, Dict
 import streamlit as st
 
+# Seconds an access record is reused before the user store is read again
+ACCESS_CACHE_TTL = 30
+
+# Database files whose schema and default admin have been set up in this process
+_initialized_paths = set()
+_init_lock = threading.Lock()
+# user_id -> (expires_at, access record), shared by every session of the process
+_access_cache = {}
+_access_cache_lock = threading.Lock()
+
+@st.cache_resource
+def _get_pool(db_path):
+    """Idle connections to db_path, shared by every session and script thread of the process
+
+    A connection is used by one thread at a time and put back afterwards, so
+    reads run side by side and only writes wait for each other, in SQLite.
+    """
+    return queue.SimpleQueue()
+
+def _open_connection(db_path):
+    # Parameterized statements are prepared once and reused from the statement cache
+    conn = sqlite3.connect(db_path, timeout=10, cached_statements=64, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _invalidate_access(user_id=None):
+    with _access_cache_lock:
+        if user_id is None:
+            _access_cache.clear()
+        else:
+            _access_cache.pop(user_id, None)
+
 class UserManagement:
     def __init__(self):
         # Ensure data directory exists
         os.makedirs("./database", exist_ok=True)
         self.db_path = "./database/user_auth.db"
-        self._init_database()
+        # The schema only needs to be checked once per process
+        with _init_lock:
+            if self.db_path not in _initialized_paths:
+                self._init_database()
+                _initialized_paths.add(self.db_path)
+    
+    @contextmanager
+    def _connect(self):
+        """Borrow a connection from the process pool, opening one if all are in use"""
+        pool = _get_pool(self.db_path)
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = _open_connection(self.db_path)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                # Leave no open transaction to the next borrower
+                conn.rollback()
+            pool.put(conn)
     
     def _init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Create users table
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                    (user_id TEXT PRIMARY KEY,
-                     password_hash TEXT NOT NULL,
-                     is_admin BOOLEAN NOT NULL,
-                     branch_access TEXT NOT NULL,
-                     tab_access TEXT NOT NULL)''')
-        
-        # Create default admin if not exists
-        c.execute("SELECT * FROM users WHERE user_id = 'admin'")
-        if not c.fetchone():
-            # Default password: admin123
-            default_password = hashlib.sha256("admin1122".encode()).hexdigest()
-            c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
-                     ("admin", default_password, True, "all", "all"))
-        
-        conn.commit()
-        conn.close()
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            # Create users table
+            c.execute('''CREATE TABLE IF NOT EXISTS users
+                        (user_id TEXT PRIMARY KEY,
+                         password_hash TEXT NOT NULL,
+                         is_admin BOOLEAN NOT NULL,
+                         branch_access TEXT NOT NULL,
+                         tab_access TEXT NOT NULL)''')
+        
+            # Create default admin if not exists
+            c.execute("SELECT * FROM users WHERE user_id = 'admin'")
+            if not c.fetchone():
+                # Default password: admin123
+                default_password = hashlib.sha256("admin1122".encode()).hexdigest()
+                c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                         ("admin", default_password, True, "all", "all"))
+        
+            conn.commit()
     
     def verify_password(self, user_id: str, password: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        with self._connect() as conn:
+            c = conn.cursor()
         
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        c.execute("SELECT password_hash FROM users WHERE user_id = ?", (user_id,))
-        result = c.fetchone()
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
+            c.execute("SELECT password_hash FROM users WHERE user_id = ?", (user_id,))
+            result = c.fetchone()
         
-        conn.close()
-        return result and result[0] == password_hash
+            return result and result[0] == password_hash
     
     def change_password(self, user_id: str, old_password: str, new_password: str) -> bool:
         if not self.verify_password(user_id, old_password):
             return False
         
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        new_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-        c.execute("UPDATE users SET password_hash = ? WHERE user_id = ?",
-                 (new_password_hash, user_id))
+        with self._connect() as conn:
+            c = conn.cursor()
         
-        conn.commit()
-        conn.close()
-        return True
-    
-    def create_user(self, user_id: str, password: str, branch_access: str, tab_access: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+            new_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
+            c.execute("UPDATE users SET password_hash = ? WHERE user_id = ?",
+                     (new_password_hash, user_id))
         
-        try:
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
-                     (user_id, password_hash, False, branch_access, tab_access))
             conn.commit()
             return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
+    
+    def create_user(self, user_id: str, password: str, branch_access: str, tab_access: str) -> bool:
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            try:
+                password_hash = hashlib.sha256(password.encode()).hexdigest()
+                c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                         (user_id, password_hash, False, branch_access, tab_access))
+                conn.commit()
+                _invalidate_access(user_id)
+                return True
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                return False
     
     def get_user_access(self, user_id: str) -> Optional[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("SELECT is_admin, branch_access, tab_access FROM users WHERE user_id = ?",
-                 (user_id,))
-        result = c.fetchone()
-        
-        conn.close()
-        
-        if result:
-            return {
-                "is_admin": bool(result[0]),
-                "branch_access": result[1],
-                "tab_access": result[2]
-            }
-        return None
+        """Get a user's access record, cached for ACCESS_CACHE_TTL seconds"""
+        with _access_cache_lock:
+            cached = _access_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+        
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            c.execute("SELECT is_admin, branch_access, tab_access FROM users WHERE user_id = ?",
+                     (user_id,))
+            result = c.fetchone()
+        
+            if result:
+                access = {
+                    "is_admin": bool(result[0]),
+                    "branch_access": result[1],
+                    "tab_access": result[2]
+                }
+                with _access_cache_lock:
+                    _access_cache[user_id] = (time.monotonic() + ACCESS_CACHE_TTL, access)
+                return dict(access)
+            return None
     
     def get_all_users(self) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        with self._connect() as conn:
+            c = conn.cursor()
         
-        c.execute("SELECT user_id, is_admin, branch_access, tab_access FROM users")
-        users = c.fetchall()
+            c.execute("SELECT user_id, is_admin, branch_access, tab_access FROM users")
+            users = c.fetchall()
         
-        conn.close()
         
-        return [{
-            "user_id": user[0],
-            "is_admin": bool(user[1]),
-            "branch_access": user[2],
-            "tab_access": user[3]
-        } for user in users]
+            return [{
+                "user_id": user[0],
+                "is_admin": bool(user[1]),
+                "branch_access": user[2],
+                "tab_access": user[3]
+            } for user in users]
     
     def update_user_access(self, user_id: str, branch_access: str, tab_access: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        try:
-            c.execute("UPDATE users SET branch_access = ?, tab_access = ? WHERE user_id = ?",
-                     (branch_access, tab_access, user_id))
-            conn.commit()
-            return True
-        except:
-            return False
-        finally:
-            conn.close()
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            try:
+                c.execute("UPDATE users SET branch_access = ?, tab_access = ? WHERE user_id = ?",
+                         (branch_access, tab_access, user_id))
+                conn.commit()
+                return True
+            except:
+                conn.rollback()
+                return False
+            finally:
+                _invalidate_access(user_id)
     
     def delete_user(self, user_id: str) -> bool:
         if user_id == "admin":  # Prevent admin deletion
             return False
             
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        try:
-            c.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-            conn.commit()
-            return True
-        except:
-            return False
-        finally:
-            conn.close()
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            try:
+                c.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+                conn.commit()
+                return True
+            except:
+                conn.rollback()
+                return False
+            finally:
+                _invalidate_access(user_id)
     
     def admin_change_password(self, user_id: str, new_password: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        try:
-            new_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-            c.execute("UPDATE users SET password_hash = ? WHERE user_id = ?",
-                     (new_password_hash, user_id))
-            conn.commit()
-            return True
-        except:
-            return False
-        finally:
-            conn.close() 
\ No newline at end of file
+        with self._connect() as conn:
+            c = conn.cursor()
+        
+            try:
+                new_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
+                c.execute("UPDATE users SET password_hash = ? WHERE user_id = ?",
+                         (new_password_hash, user_id))
+                conn.commit()
+                return True
+            except:
+                conn.rollback()
+                return False 
\ No newline at end of file
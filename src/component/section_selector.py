@@ -0,0 +1,23 @@
+import streamlit as st
+
+@st.fragment
+def show_sections(sections, key):
+    """Show a selector over the dashboard sections and render only the chosen one
+
+    Unlike st.tabs, which runs every tab body on each rerun, only the selected
+    section is computed. Switching sections reruns this fragment, not the page.
+
+    Args:
+        sections (dict): Section label -> function rendering that section
+        key (str): Session state key of the selector
+    """
+    labels = list(sections)
+    selected = st.segmented_control(
+        "Bagian:",
+        options=labels,
+        default=labels[0],
+        key=key,
+        label_visibility="collapsed"
+    )
+    # Clicking the active option deselects it; keep showing the first section then
+    sections[selected or labels[0]]()
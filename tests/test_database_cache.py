@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+from src.backend import database_cache
+from src.backend.database_cache import WATERMARK_COLUMN, get_partitioned_data
+
+DAYS = pd.date_range('2024-01-01', '2024-01-03', freq='D')
+STORED = '2024-02-01T00:00:00+00:00'
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(database_cache, '_last_refresh', {})
+    return tmp_path
+
+def _manifest(rows=2, watermark=STORED):
+    return {day.strftime('%Y-%m-%d'): {'columns': ['tanggal'], 'rows': rows, 'watermark': watermark}
+            for day in DAYS}
+
+def _changes(*rows):
+    return pd.DataFrame(list(rows), columns=['tanggal', WATERMARK_COLUMN])
+
+def _counts(rows_per_day):
+    return pd.DataFrame(list(rows_per_day.items()), columns=['tanggal', 'row_count'])
+
+def _stale(manifest, changes=None, counts=None):
+    fetch_changes = lambda start, end, since: changes if changes is not None else _changes()
+    fetch_counts = None if counts is None else (lambda start, end: counts)
+    return database_cache._find_stale_days('facts', manifest, DAYS, fetch_changes, fetch_counts=fetch_counts)
+
+def test_unchanged_days_are_not_stale():
+    counts = _counts({'2024-01-01': 2, '2024-01-02': 2, '2024-01-03': 2})
+    assert _stale(_manifest(), counts=counts) == set()
+
+def test_rows_updated_after_the_watermark_are_stale():
+    changes = _changes(('2024-01-02', '2024-02-02T00:00:00+00:00'), ('2024-01-03', STORED))
+    assert _stale(_manifest(), changes) == {'2024-01-02'}
+
+def test_days_that_lost_rows_are_stale():
+    counts = _counts({'2024-01-01': 2, '2024-01-02': 1})
+    assert _stale(_manifest(), counts=counts) == {'2024-01-02', '2024-01-03'}
+
+def test_days_without_watermark_are_stale_without_a_query():
+    def fetch_changes(start, end, since):
+        raise AssertionError("no watermark to check against")
+    stale = database_cache._find_stale_days('facts', _manifest(watermark=None), DAYS, fetch_changes)
+    assert stale == {'2024-01-01', '2024-01-02', '2024-01-03'}
+
+def test_failed_count_check_still_checks_updates():
+    def fetch_counts(start, end):
+        raise RuntimeError("function missing")
+    changes = _changes(('2024-01-01', '2024-02-02T00:00:00+00:00'))
+    stale = database_cache._find_stale_days('facts', _manifest(), DAYS, lambda *args: changes,
+                                            fetch_counts=fetch_counts)
+    assert stale == {'2024-01-01'}
+
+def test_checks_are_skipped_until_the_version_moves():
+    calls = []
+    fetch_changes = lambda start, end, since: calls.append(since) or _changes()
+    for version in (1, 1, 2):
+        database_cache._find_stale_days('facts', _manifest(), DAYS, fetch_changes, version)
+    assert len(calls) == 2
+
+def _server_rows():
+    return pd.DataFrame({
+        'tanggal': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-03']),
+        'nominal': [1.0, 2.0, 3.0, 4.0],
+        'kode_cabang': ['01', '02', '01', '01'],
+        WATERMARK_COLUMN: [STORED] * 4,
+    })
+
+def _load(server, columns, fetched):
+    def fetch(start, end, fetch_columns):
+        fetched.append((start, end, list(fetch_columns)))
+        rows = server[(server['tanggal'] >= start) & (server['tanggal'] <= end)]
+        return rows[[col for col in fetch_columns if col in rows.columns]].reset_index(drop=True)
+
+    def fetch_changes(start, end, since):
+        return server.loc[pd.to_datetime(server[WATERMARK_COLUMN]) > since, ['tanggal', WATERMARK_COLUMN]]
+
+    def fetch_counts(start, end):
+        return server.groupby('tanggal').size().rename('row_count').reset_index()
+
+    return get_partitioned_data('facts', DAYS[0], DAYS[-1], columns, fetch, fetch_changes,
+                                fetch_counts=fetch_counts)
+
+def test_partitions_are_reused_and_refetched_after_deletes():
+    server = _server_rows()
+    fetched = []
+    first = _load(server, ['tanggal', 'nominal'], fetched)
+    assert first['nominal'].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert len(fetched) == 1
+
+    database_cache._last_refresh.clear()
+    assert _load(server, ['tanggal', 'nominal'], fetched).equals(first)
+    assert len(fetched) == 1
+
+    # Deleting a row leaves no newer updated_at, only a smaller count
+    server = server[server['nominal'] != 2.0].reset_index(drop=True)
+    database_cache._last_refresh.clear()
+    assert _load(server, ['tanggal', 'nominal'], fetched)['nominal'].tolist() == [1.0, 3.0, 4.0]
+    assert fetched[-1][:2] == (DAYS[0], DAYS[0])
+
+def test_columns_of_earlier_loads_are_fetched_together():
+    server = _server_rows()
+    fetched = []
+    _load(server, ['tanggal', 'nominal'], fetched)
+    database_cache._last_refresh.clear()
+    both = _load(server, ['tanggal', 'kode_cabang'], fetched)
+    # The new column is fetched along with the stored ones, so partitions keep both
+    assert set(fetched[-1][2]) >= {'tanggal', 'nominal', 'kode_cabang'}
+    assert both['kode_cabang'].astype(str).tolist() == ['01', '02', '01', '01']
+    database_cache._last_refresh.clear()
+    _load(server, ['tanggal', 'nominal'], fetched)
+    assert len(fetched) == 2
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.backend import consolidate_sqlite, database_offline
+from src.backend.database_offline import get_offline_data
+
+# The January table also holds the first day of February
+MONTHLY_ROWS = {
+    'deposito.db': {
+        'DepositoData202401': [
+            ('2024-01-30 00:00:00.000000', '00', '31', 100.0),
+            ('2024-01-31 00:00:00.000000', '00', '31', 200.0),
+            ('2024-01-31 00:00:00.000000', '10', '32', 300.0),
+            ('2024-02-01 00:00:00.000000', '10', '31', 400.0),
+        ],
+        'DepositoData202402': [
+            ('2024-02-02 00:00:00.000000', '00', '32', 500.0),
+        ],
+    },
+    'rahn.db': {
+        'RahnData202401': [
+            ('20240131', '00', '01', '01', 10.0),
+            ('20240131', '10', '01', '03', 20.0),
+            ('20240201', '00', '01', '02', 30.0),
+        ],
+        'RahnData202402': [
+            ('20240202', '10', '02', '01', 40.0),
+        ],
+    },
+}
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    """Monthly snapshot files in tmp_path and a consolidated store path that does not exist yet"""
+    for file_name, tables in MONTHLY_ROWS.items():
+        with sqlite3.connect(tmp_path / file_name) as conn:
+            for table, rows in tables.items():
+                if file_name == 'rahn.db':
+                    conn.execute(f'CREATE TABLE "{table}" ("Tanggal" TEXT, "KodeCabang" TEXT, "KodeProduk" TEXT, '
+                                 f'"Kolektibilitas" TEXT, "Nominal" FLOAT)')
+                else:
+                    conn.execute(f'CREATE TABLE "{table}" ("Tanggal" DATETIME, "KodeCabang" TEXT, '
+                                 f'"KodeProduk" TEXT, "Nominal" FLOAT)')
+                conn.executemany(f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(rows[0]))})', rows)
+    store = str(tmp_path / 'ams_local.db')
+    monkeypatch.setattr(database_offline, 'SQLITE_DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(consolidate_sqlite, 'SQLITE_DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(database_offline, 'CONSOLIDATED_DB_PATH', store)
+    return store
+
+def _read(table_name, columns, **filters):
+    df = get_offline_data(table_name, '2024-01-31', '2024-02-29', columns, **filters)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+@pytest.mark.parametrize('table_name, columns', [
+    ('deposito_data', ['tanggal', 'kode_cabang', 'kode_produk', 'nominal']),
+    ('rahn_data', ['tanggal', 'kode_cabang', 'kode_produk', 'nominal', 'kolektibilitas']),
+])
+def test_consolidated_store_reads_like_the_monthly_tables(snapshots, table_name, columns):
+    monthly = _read(table_name, columns)
+    monthly_branch = _read(table_name, columns, branches=('10',))
+    assert not database_offline._has_consolidated(table_name)
+
+    assert consolidate_sqlite.consolidate(target_path=snapshots) == 4
+    assert database_offline._has_consolidated(table_name)
+    consolidated = _read(table_name, columns)
+    pd.testing.assert_frame_equal(consolidated, monthly)
+    pd.testing.assert_frame_equal(_read(table_name, columns, branches=('10',)), monthly_branch)
+    # The day the January table holds beyond its month is kept
+    assert pd.Timestamp('2024-02-01') in set(consolidated['tanggal'])
+
+def test_consolidate_copies_only_changed_months(snapshots):
+    assert consolidate_sqlite.consolidate(target_path=snapshots) == 4
+    assert consolidate_sqlite.consolidate(target_path=snapshots) == 0
+    with sqlite3.connect(database_offline._snapshot_path('rahn_data')) as conn:
+        conn.execute("INSERT INTO RahnData202402 VALUES ('20240203', '00', '01', '01', 50.0)")
+    assert consolidate_sqlite.consolidate(target_path=snapshots) == 1
+    assert 50.0 in set(_read('rahn_data', ['tanggal', 'nominal'])['nominal'])
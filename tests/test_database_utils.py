@@ -0,0 +1,52 @@
+import pandas as pd
+
+from src.backend.database_utils import TypedFrameBuilder, build_cube, reads_daily_totals
+
+PEMBIAYAAN_COLUMNS = ['tanggal', 'kode_cabang', 'kode_produk', 'kolektibilitas', 'jml_pencairan',
+                      'byr_pokok', 'outstanding', 'kode_grup1', 'kode_grup2', 'kd_kolektor']
+
+def test_build_cube_sums_rows_of_the_same_cell():
+    df = pd.DataFrame({
+        'Tanggal': pd.to_datetime(['2024-01-02', '2024-01-01', '2024-01-01', '2024-01-01']),
+        'KodeCabang': pd.Categorical(['01', '01', '01', '02']),
+        'KodeGrup1': pd.Categorical([None, None, None, 'A']),
+        'Nominal': [1.0, 2.0, 3.0, 4.0],
+    })
+    cube = build_cube(df, ['Nominal'])
+    assert list(cube.columns) == list(df.columns)
+    assert cube['Tanggal'].is_monotonic_increasing
+    assert sorted(cube['Nominal']) == [1.0, 4.0, 5.0]
+    # A cube is its own cube
+    assert len(build_cube(cube, ['Nominal'])) == len(cube)
+
+def test_daily_views_serve_the_loaded_columns():
+    assert reads_daily_totals('pembiayaan_data', PEMBIAYAAN_COLUMNS, aggregate=True)
+    assert reads_daily_totals('rahn_data', ['tanggal', 'kode_cabang', 'kode_produk', 'nominal', 'kolektibilitas'],
+                              aggregate=True)
+    # Raw rows when the view lacks a column or views are off
+    assert not reads_daily_totals('pembiayaan_data', PEMBIAYAAN_COLUMNS + ['kd_sts_pemb'], aggregate=True)
+    assert not reads_daily_totals('pembiayaan_data', PEMBIAYAAN_COLUMNS, aggregate=False)
+
+def test_typed_frame_builder_dtypes():
+    columns = ['tanggal', 'kode_cabang', 'kolektibilitas', 'outstanding']
+    builder = TypedFrameBuilder(columns)
+    builder.append([
+        {'tanggal': '2024-01-01', 'kode_cabang': '01', 'kolektibilitas': '3', 'outstanding': '1.5'},
+        {'tanggal': '2024-01-02T00:00:00', 'kode_cabang': None, 'kolektibilitas': None, 'outstanding': None},
+    ])
+    other = TypedFrameBuilder(columns)
+    other.append_rows([('2024-01-03', '02', 1, 2)])
+    builder.extend(other)
+
+    df = builder.build()
+    assert builder.row_count == 3
+    assert list(df.columns) == columns
+    assert df['tanggal'].dtype == 'datetime64[ns]'
+    assert isinstance(df['kode_cabang'].dtype, pd.CategoricalDtype)
+    assert df['kolektibilitas'].tolist() == [3, 0, 1] and df['kolektibilitas'].dtype == 'int8'
+    assert df['outstanding'].dtype == 'float64' and df['outstanding'].isna().tolist() == [False, True, False]
+
+def test_typed_frame_builder_without_rows():
+    df = TypedFrameBuilder(['tanggal', 'kode_cabang', 'outstanding']).build()
+    assert df.empty
+    assert df['tanggal'].dtype == 'datetime64[ns]' and df['outstanding'].dtype == 'float64'
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from src.backend import frame_cache
+from src.backend.frame_cache import FrameCache, cache_frames, frame_size
+
+def _frame(rows):
+    return pd.DataFrame({'Nominal': [1.0] * rows})
+
+def test_get_returns_shallow_copies():
+    cache = FrameCache(max_bytes=10 ** 6)
+    cache.put('key', _frame(3))
+    found, value = cache.get('key')
+    assert found
+    value['Extra'] = 1
+    assert 'Extra' not in cache.get('key')[1].columns
+
+def test_evicts_least_recently_used_beyond_budget():
+    size = frame_size(_frame(100))
+    cache = FrameCache(max_bytes=2 * size)
+    cache.put('a', _frame(100))
+    cache.put('b', _frame(100))
+    cache.get('a')
+    cache.put('c', _frame(100))
+    assert cache.get('a')[0] and cache.get('c')[0]
+    assert not cache.get('b')[0]
+    assert cache.stats()['evictions'] == 1
+    assert cache.current_bytes == 2 * size
+
+def test_skips_values_larger_than_budget():
+    cache = FrameCache(max_bytes=10)
+    cache.put('big', _frame(100))
+    assert not cache.get('big')[0]
+    assert cache.current_bytes == 0
+
+def test_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(frame_cache.time, 'monotonic', lambda: now[0])
+    cache = FrameCache(max_bytes=10 ** 6)
+    cache.put('key', _frame(1), ttl=60)
+    assert cache.get('key')[0]
+    now[0] += 61
+    assert not cache.get('key')[0]
+    assert cache.current_bytes == 0
+
+def test_caches_empty_results():
+    cache = FrameCache(max_bytes=10 ** 6)
+    calls = []
+    compute = lambda: calls.append(1) or (pd.DataFrame(), _frame(2))
+    for _ in range(3):
+        empty, frame = cache.get_or_compute('key', compute)
+        assert empty.empty and len(frame) == 2
+    assert len(calls) == 1
+
+def test_does_not_cache_failures():
+    cache = FrameCache(max_bytes=10 ** 6)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("fetch failed")
+        return _frame(1)
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', compute)
+    assert len(cache.get_or_compute('key', compute)) == 1
+    assert len(cache.get_or_compute('key', compute)) == 1
+    assert len(calls) == 2
+
+def test_cache_frames_keys_on_arguments(monkeypatch):
+    monkeypatch.setattr(frame_cache, 'frame_cache', FrameCache(max_bytes=10 ** 6))
+    calls = []
+
+    @cache_frames()
+    def load(rows, branches=None):
+        calls.append((rows, branches))
+        return _frame(rows)
+
+    load(1, branches=['01'])
+    load(1, branches=('01',))
+    load(2)
+    assert calls == [(1, ['01']), (2, None)]
+    load.clear()
+    load(2)
+    assert len(calls) == 3
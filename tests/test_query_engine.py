@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+from src.backend import arrow_snapshots, query_engine
+
+BRANCHES = ['01', '02']
+PRODUCTS = ['10', '11']
+
+def _facts():
+    rng = np.random.default_rng(0)
+    rows = 2000
+    return pd.DataFrame({
+        'Tanggal': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, rows), 'D'),
+        'KodeCabang': pd.Categorical(rng.choice(['01', '02', '03'], rows)),
+        'KodeProduk': pd.Categorical(rng.choice(['10', '11', '12'], rows)),
+        'KodeGrup1': pd.Categorical(rng.choice(['A', 'B', None], rows)),
+        'Nominal': rng.random(rows) * 1e9,
+        'Kolektibilitas': rng.integers(1, 6, rows).astype('int8'),
+    })
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    """The test facts written and mapped back as a snapshot"""
+    monkeypatch.setattr(arrow_snapshots, 'SNAPSHOT_DIR', str(tmp_path))
+    assert arrow_snapshots.write_snapshot('facts', _facts())
+    found, df = arrow_snapshots.read_snapshot('facts')
+    assert found
+    return df
+
+def _select(df):
+    return query_engine.select_facts(df, '2024-01-10', '2024-02-10', BRANCHES, PRODUCTS)
+
+def _aggregate(source):
+    branch_filter = {'KodeCabang': '02'}
+    return (
+        query_engine.first_last_totals(source, 'Nominal', branch_filter),
+        query_engine.first_last_totals(source, 'Nominal', min_kolektibilitas=3),
+        query_engine.group_totals(source, ['KodeProduk'], 'Nominal', branch_filter, latest_only=True),
+        query_engine.group_totals(source, ['KodeGrup1'], 'Nominal', latest_only=True, top_first=True),
+        query_engine.period_totals(source, 'Nominal', 'W-MON'),
+        query_engine.pivot_totals(source, 'Nominal', index='KodeProduk', columns='KodeCabang'),
+    )
+
+def _assert_same(expected, actual):
+    for expected_totals, totals in zip(expected[:2], actual[:2]):
+        np.testing.assert_allclose(expected_totals, totals)
+    for expected_totals, totals in zip(expected[2:5], actual[2:5]):
+        assert list(totals.iloc[:, 0].astype(str)) == list(expected_totals.iloc[:, 0].astype(str))
+        np.testing.assert_allclose(totals['Nominal'], expected_totals['Nominal'])
+    assert list(actual[5].index.astype(str)) == list(expected[5].index.astype(str))
+    assert list(actual[5].columns.astype(str)) == list(expected[5].columns.astype(str))
+    np.testing.assert_allclose(actual[5].values, expected[5].values)
+
+def test_duckdb_scans_the_snapshot_file(snapshot, monkeypatch):
+    selected = _select(snapshot)
+    # Shallow copies, as the frame cache returns, still map the file
+    assert arrow_snapshots.snapshot_source(snapshot.copy(deep=False)) is not None
+
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'pandas')
+    expected = _aggregate(selected)
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'duckdb')
+    scanned = []
+    dataset = query_engine.ds.dataset
+    monkeypatch.setattr(query_engine.ds, 'dataset', lambda path, **kwargs: scanned.append(path) or dataset(path, **kwargs))
+    _assert_same(expected, _aggregate(selected))
+    assert scanned and set(scanned) == {arrow_snapshots._frame_path('facts', 0)}
+
+def test_duckdb_falls_back_to_the_frame(snapshot, monkeypatch):
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'pandas')
+    expected = _aggregate(_select(snapshot))
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'duckdb')
+    # A frame without a snapshot behind it
+    _assert_same(expected, _aggregate(_select(_facts())))
+
+def test_duckdb_reads_derived_frames_from_memory(snapshot, monkeypatch):
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'duckdb')
+    # Same length and attrs as the mapped frame, other amounts
+    derived = snapshot.assign(Nominal=snapshot['Nominal'] * 2)
+    assert arrow_snapshots.snapshot_source(derived) is None
+    mapped = query_engine.group_totals(snapshot, ['KodeProduk'], 'Nominal')
+    np.testing.assert_allclose(query_engine.group_totals(derived, ['KodeProduk'], 'Nominal')['Nominal'],
+                               mapped['Nominal'] * 2)
+    np.testing.assert_allclose(query_engine.first_last_totals(_select(derived), 'Nominal'),
+                               np.multiply(query_engine.first_last_totals(_select(snapshot), 'Nominal'), 2))
+
+    replaced = snapshot.copy(deep=False)
+    replaced['Nominal'] = 0.0
+    assert query_engine.first_last_totals(_select(replaced), 'Nominal') == (0, 0)
+
+def test_duckdb_empty_selection(snapshot, monkeypatch):
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', 'duckdb')
+    selected = query_engine.select_facts(snapshot, '2024-01-10', '2024-02-10', BRANCHES, [])
+    assert selected.empty
+    assert query_engine.first_last_totals(selected, 'Nominal') == (0, 0)
+    assert query_engine.group_totals(selected, ['KodeProduk'], 'Nominal').empty
+    assert query_engine.first_last_totals(_select(snapshot), 'Nominal', {'KodeCabang': '03'}) == (0, 0)
+    assert query_engine.period_totals(selected, 'Nominal', 'D').empty
+    assert not query_engine.has_values(selected, 'KodeGrup1')
+    assert query_engine.has_values(_select(snapshot), 'KodeGrup1')
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.backend import sync_worker
+from src.backend.sync_worker import changed_partitions, fingerprint_frame, select_partitions
+
+COLUMNS = list(sync_worker.SYNC_TABLES['rahn_data']['columns'])
+SOURCE_ROWS = [
+    ('20240101', '01', '10', 100.0, '1'),
+    ('20240101', '01', '11', 200.0, '1'),
+    ('20240101', '02', '10', 300.0, '2'),
+    ('20240102', '01', '10', 400.0, '1'),
+]
+
+def _frame(rows):
+    return pd.DataFrame({
+        'tanggal': pd.to_datetime([row[0] for row in rows]),
+        'kode_cabang': pd.Categorical([row[1] for row in rows]),
+        'kode_produk': pd.Categorical([row[2] for row in rows]),
+        'nominal': [row[3] for row in rows],
+        'kolektibilitas': pd.Series([int(row[4]) for row in rows], dtype='int8'),
+    })
+
+def _checksums(rows):
+    fingerprints = fingerprint_frame(_frame(rows), COLUMNS)
+    return dict(zip(zip(fingerprints['tanggal'].dt.strftime('%Y-%m-%d'), fingerprints['kode_cabang']),
+                    fingerprints['checksum']))
+
+def test_fingerprints_ignore_row_order():
+    assert _checksums(SOURCE_ROWS) == _checksums(SOURCE_ROWS[::-1])
+
+def test_fingerprints_change_with_any_column():
+    before = _checksums(SOURCE_ROWS)
+    product_changed = [('20240101', '01', '99', 100.0, '1')] + SOURCE_ROWS[1:]
+    # Amounts swapped between rows keep the partition's total
+    amounts_swapped = [('20240101', '01', '10', 200.0, '1'), ('20240101', '01', '11', 100.0, '1')] + SOURCE_ROWS[2:]
+    for rows in (product_changed, amounts_swapped):
+        after = _checksums(rows)
+        assert after[('2024-01-01', '01')] != before[('2024-01-01', '01')]
+        assert after[('2024-01-01', '02')] == before[('2024-01-01', '02')]
+
+def test_changed_partitions_compares_exact_checksums():
+    source = sync_worker._normalize_fingerprints(fingerprint_frame(_frame(SOURCE_ROWS), COLUMNS))
+    target = source.copy()
+    # Differs from the source only beyond float precision
+    target.loc[0, 'checksum'] = source.loc[0, 'checksum'] + 1
+    target.loc[len(target)] = [pd.Timestamp('2024-01-03'), '01', 1, 5]
+    changed, removed = changed_partitions(source, target)
+    assert changed == {(source.loc[0, 'tanggal'], source.loc[0, 'kode_cabang'])}
+    assert removed == {(pd.Timestamp('2024-01-03'), '01')}
+
+def test_select_partitions():
+    df = _frame(SOURCE_ROWS)
+    selected = select_partitions(df, {(pd.Timestamp('2024-01-01'), '01')})
+    assert selected['nominal'].tolist() == [100.0, 200.0]
+    assert select_partitions(df, set()).empty
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """A SQLite source with one monthly rahn table and an empty SQLite target"""
+    source_path = tmp_path / 'source.db'
+    with sqlite3.connect(source_path) as conn:
+        conn.execute("CREATE TABLE RahnData202401 (Tanggal TEXT, KodeCabang TEXT, KodeProduk TEXT, "
+                     "Nominal REAL, Kolektibilitas TEXT)")
+        conn.executemany("INSERT INTO RahnData202401 VALUES (?, ?, ?, ?, ?)", SOURCE_ROWS)
+    source = create_engine(f"sqlite:///{source_path}")
+    target_url = f"sqlite:///{tmp_path / 'target.db'}"
+    monkeypatch.setattr(sync_worker, '_source_engine', lambda table_name: source)
+    monkeypatch.setattr(sync_worker, 'SYNC_TARGET_URL', target_url)
+    return source_path, target_url
+
+def _target_rows(target_url):
+    with create_engine(target_url).connect() as conn:
+        df = pd.read_sql_query("SELECT tanggal, kode_cabang, kode_produk, nominal FROM rahn_data", conn)
+    return sorted(df.itertuples(index=False, name=None))
+
+def test_sync_table_writes_only_changed_partitions(databases):
+    source_path, target_url = databases
+    assert sync_worker.sync_table('rahn_data', since='202401') == 3
+    assert len(_target_rows(target_url)) == 4
+    assert sync_worker.sync_table('rahn_data', since='202401') == 0
+
+    with sqlite3.connect(source_path) as conn:
+        conn.execute("UPDATE RahnData202401 SET KodeProduk = '99' WHERE Nominal = 100")
+        conn.execute("DELETE FROM RahnData202401 WHERE Tanggal = '20240102'")
+    # One partition changed and one removed
+    assert sync_worker.sync_table('rahn_data', since='202401') == 2
+    assert _target_rows(target_url) == [
+        ('2024-01-01', '01', '11', 200.0),
+        ('2024-01-01', '01', '99', 100.0),
+        ('2024-01-01', '02', '10', 300.0),
+    ]